@@ -6,10 +6,13 @@ import json
 import logging
 import os
 import subprocess  # noqa: S404
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import requests
 
+from openqa_api import new_session
+
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -24,7 +27,11 @@ machine_list_broken = []
 machine_list_busy = []
 machines_to_power_on = []
 
-jobs_worker_classes = []
+jobs_worker_classes = set()
+
+# Number of jobs queried at once and number of queries in flight
+CHUNK_SIZE = 100
+WORKERS = 16
 
 config_file = Path(os.environ.get("OPENQA_CONFIG", "/etc/openqa")).joinpath("openqa.ini")
 config = configparser.ConfigParser()
@@ -60,18 +67,36 @@ logger.info("")
 scheduled_list_file = requests.get(openqa_server + "/tests/list_scheduled_ajax", timeout=60).content
 scheduled_list_data = json.loads(scheduled_list_file)
 logger.info(
-    "Processing %s job(s) in scheduled/blocked state... (will take about %s seconds)",
+    "Processing %s job(s) in scheduled/blocked state...",
     len(scheduled_list_data["data"]),
-    int(len(scheduled_list_data["data"]) * 0.2),
 )
 
-# Create list of WORKER_CLASS needed
-for job in scheduled_list_data["data"]:
-    response = requests.get(openqa_server + "/api/v1/jobs/" + str(job["id"]), timeout=60)
-    job_data = json.loads(response.content)
-    jobs_worker_classes.append(job_data["job"]["settings"]["WORKER_CLASS"])
 
-jobs_worker_classes = sorted(set(jobs_worker_classes))
+def fetch_worker_classes(session: requests.Session, ids: list[str]) -> list[str]:
+    """Return the WORKER_CLASS of the jobs with one job list query.
+
+    Jobs missing in the list are fetched on their own.
+    """
+    response = session.get(openqa_server + "/api/v1/jobs", params={"ids": ",".join(ids)}, timeout=60)
+    jobs = response.json()["jobs"]
+    classes = [job["settings"]["WORKER_CLASS"] for job in jobs]
+    found = {str(job["id"]) for job in jobs}
+    for job_id in ids:
+        if job_id not in found:
+            response = session.get(openqa_server + "/api/v1/jobs/" + job_id, timeout=60)
+            classes.append(response.json()["job"]["settings"]["WORKER_CLASS"])
+    return classes
+
+
+# Create list of WORKER_CLASS needed, querying chunks of jobs concurrently
+scheduled_ids = [str(job["id"]) for job in scheduled_list_data["data"]]
+chunks = [scheduled_ids[n : n + CHUNK_SIZE] for n in range(0, len(scheduled_ids), CHUNK_SIZE)]
+session = new_session(pool_size=WORKERS)
+with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+    for future in as_completed([executor.submit(fetch_worker_classes, session, chunk) for chunk in chunks]):
+        jobs_worker_classes.update(future.result())
+
+jobs_worker_classes = sorted(jobs_worker_classes)
 logger.info(
     "Found %s different WORKER_CLASS in scheduled jobs: %s",
     len(jobs_worker_classes),
@@ -0,0 +1,172 @@
+# Copyright SUSE LLC
+"""Minimal in-process openQA API client.
+
+It signs the requests with the API key & secret from client.conf the same way
+openqa-cli does so scripts don't have to spawn a process for every API call.
+"""
+
+from __future__ import annotations
+
+import configparser
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TIMEOUT = 30
+
+log = logging.getLogger(__name__)
+
+
+def new_session(pool_size: int = 100) -> requests.Session:
+    """Return a pooled session retrying idempotent requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            allowed_methods=["GET", "HEAD"],
+            backoff_factor=0.1,
+            # This list should end up like: [413, 429, 502, 503, 504] (sorted)
+            status_forcelist=[*Retry.RETRY_AFTER_STATUS_CODES, 502, 504],
+            total=5,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def config_files() -> list[Path]:
+    """Return the client.conf files in the order openqa-cli looks them up."""
+    files = [
+        Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config")) / "openqa" / "client.conf",
+        Path("/etc/openqa/client.conf"),
+    ]
+    if os.environ.get("OPENQA_CONFIG"):
+        files.insert(0, Path(os.environ["OPENQA_CONFIG"]) / "client.conf")
+    return files
+
+
+def read_credentials(host: str) -> tuple[str | None, str | None]:
+    """Return the API key & secret for the host from the first client.conf having them."""
+    netloc = urlparse(host).netloc or host
+    for path in config_files():
+        config = configparser.ConfigParser()
+        try:
+            config.read(path)
+        except configparser.Error as error:
+            log.warning("Ignoring %s: %s", path, error)
+            continue
+        if config.has_section(netloc):
+            return config[netloc].get("key"), config[netloc].get("secret")
+    return None, None
+
+
+def parse_settings(args: list[str]) -> dict[str, str]:
+    """Parse KEY=VALUE arguments like openqa-clone-job does."""
+    settings = {}
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        if not sep:
+            msg = f"Invalid setting: {arg}"
+            raise ValueError(msg)
+        settings[key] = value
+    return settings
+
+
+class OpenQAClient:
+    """Client for the openQA API of one host."""
+
+    def __init__(
+        self,
+        host: str,
+        user_agent: str,
+        session: requests.Session | None = None,
+        dry_run: bool = False,  # noqa: FBT001,FBT002
+    ) -> None:
+        if not host.startswith(("http://", "https://")):
+            host = f"https://{host}"
+        url = urlparse(host)
+        self.host = f"{url.scheme}://{url.netloc}"
+        self.user_agent = user_agent
+        self.session = session or new_session()
+        self.dry_run = dry_run
+        self.apikey, self.apisecret = read_credentials(self.host)
+
+    def sign(self, request: requests.PreparedRequest) -> None:
+        """Add the openQA authentication headers to the request."""
+        if not self.apikey or not self.apisecret:
+            return
+        timestamp = str(time.time())
+        path = request.path_url.replace("%20", "+").replace("~", "%7E")
+        apihash = hmac.new(self.apisecret.encode(), f"{path}{timestamp}".encode(), hashlib.sha1)
+        request.headers.update({
+            "X-API-Key": self.apikey,
+            "X-API-Microtime": timestamp,
+            "X-API-Hash": apihash.hexdigest(),
+        })
+
+    def request(self, method: str, path: str, **kwargs: object) -> str:
+        """Send a signed request to /api/v1/<path> and return the response body.
+
+        In dry-run mode only the GET requests are sent.
+        """
+        url = f"{self.host}/api/v1/{path}"
+        if self.dry_run and method != "GET":
+            data = kwargs.get("data") or kwargs.get("json") or ""
+            return f"Simulating: {method} {url} {data}\n"
+        log.debug("request: %s %s", method, url)
+        request = requests.Request(method, url, headers={"User-Agent": self.user_agent}, **kwargs)
+        prepared = self.session.prepare_request(request)
+        self.sign(prepared)
+        got = self.session.send(prepared, timeout=TIMEOUT)
+        got.raise_for_status()
+        return got.text
+
+    def comment(self, job_id: int | str, text: str) -> str:
+        """Comment a job."""
+        return self.request("POST", f"jobs/{job_id}/comments", data={"text": text})
+
+    def put_job(self, job_id: int | str, data: dict) -> str:
+        """Update a job, e.g. its priority."""
+        return self.request("PUT", f"jobs/{job_id}", json=data)
+
+    def clone(self, job_id: int | str, settings: dict[str, str]) -> str:
+        """Clone a job within the instance skipping chained dependencies.
+
+        The settings override the ones of the original job, an empty value removes it
+        and a key ending with "+" appends to the original value.
+        Return a JSON mapping the original job to the clone like `openqa-clone-job --json-output`.
+        """
+        if self.dry_run:
+            args = " ".join(f"{key}={value}" for key, value in settings.items())
+            return f"Simulating: clone {self.host}/tests/{job_id} {args}\n"
+        job = json.loads(self.request("GET", f"jobs/{job_id}"))["job"]
+        new_settings = {
+            key: value
+            for key, value in job["settings"].items()
+            if key not in {"NAME", "START_AFTER_TEST", "START_DIRECTLY_AFTER_TEST"}
+        }
+        if "_GROUP" not in settings and "_GROUP_ID" not in settings and job.get("group_id") is not None:
+            new_settings["_GROUP_ID"] = job["group_id"]
+        for key, value in settings.items():
+            if key.endswith("+"):
+                new_settings[key[:-1]] = new_settings.get(key[:-1], "") + value
+            elif value == "":
+                new_settings.pop(key, None)
+            else:
+                new_settings[key] = value
+        new_settings["CLONED_FROM"] = f"{self.host}/tests/{job_id}"
+        new_settings["is_clone_job"] = 1
+        created = json.loads(self.request("POST", "jobs", data=new_settings))
+        ids = created.get("ids") or [created["id"]]
+        return json.dumps({str(job_id): ids[0]})
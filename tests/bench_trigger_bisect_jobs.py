@@ -0,0 +1,124 @@
+# Copyright SUSE LLC
+# ruff: noqa: T201
+"""Micro-benchmark for parsing incident changes in openqa-trigger-bisect-jobs.
+
+Run with `python tests/bench_trigger_bisect_jobs.py [repos]`. It compares the
+parsing and set algebra of a synthetic diff_to_last_good with thousands of
+repository URLs against the former implementation creating one MD5-hashed
+Incident per occurrence and parsing the ids lazily as strings.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.machinery
+import importlib.util
+import pathlib
+import re
+import sys
+import timeit
+from argparse import Namespace
+from functools import total_ordering
+
+rootpath = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(rootpath))
+
+loader = importlib.machinery.SourceFileLoader("openqa", f"{rootpath}/openqa-trigger-bisect-jobs")
+spec = importlib.util.spec_from_loader(loader.name, loader)
+openqa = importlib.util.module_from_spec(spec)
+loader.exec_module(openqa)
+
+LEGACY_INCIDENT_FROM_REPO_URL_RE = re.compile(r".*PullRequest:/(\d+):/.*")
+PRODUCTS = ["SLES", "SL-Micro", "SLE-Module-Basesystem", "SLE-Module-Server-Applications"]
+
+
+@total_ordering
+class LegacyIncident:
+    """The Incident class before interning, kept for comparison."""
+
+    def __init__(self, inc: str) -> None:
+        self.incident = inc
+        self._incident_id = None
+
+    @property
+    def incident_id(self) -> str:
+        if self._incident_id:
+            return self._incident_id
+        try:
+            match = LEGACY_INCIDENT_FROM_REPO_URL_RE.search(self.incident)
+            self._incident_id = match.group(1) if match else self.incident.split("/")[6]
+        except IndexError:
+            self._incident_id = self.incident
+        return self._incident_id
+
+    def __eq__(self, other: object) -> bool:
+        return self.incident_id == other.incident_id
+
+    def __gt__(self, other: LegacyIncident) -> bool:
+        return int(self.incident_id) > int(other.incident_id)
+
+    def __hash__(self) -> int:
+        return int(hashlib.md5(self.incident.encode()).hexdigest(), base=16)  # noqa: S324
+
+
+def legacy_find_changed_issues(investigation: str) -> dict:
+    changes = {}
+    pattern = re.compile(r"(?P<diff>[+-])\s+\"(?P<key>[A-Z]+_TEST_(?:ISSUES|REPOS))\"\s*:\s*\"(?P<var>[^\"]*)\",")
+    for line in investigation.splitlines():
+        search = pattern.match(line)
+        if search:
+            changes.setdefault(search.group("key"), {})[search.group("diff")] = {
+                LegacyIncident(i) for i in search.group("var").split(",")
+            }
+    return changes
+
+
+def legacy_bisect_groups(all_changes: dict) -> list:
+    added = []
+    for changes in all_changes.values():
+        added += list(changes["+"] - changes["-"])
+    return [[issue] for issue in sorted({i.incident_id for i in added}, key=int)]
+
+
+def synthetic_diff(repos: int) -> str:
+    """Return a diff with the given number of repositories per *_TEST_REPOS variable and side."""
+
+    def urls(offset: int) -> str:
+        return ",".join(
+            f"http://download.suse.de/ibs/SUSE:/SLFO:/1.2:/PullRequest:/{offset + i // len(PRODUCTS)}:/"
+            f"{PRODUCTS[i % len(PRODUCTS)]}/"
+            for i in range(repos)
+        )
+
+    lines = []
+    for key in ("OS", "SDK", "HA", "WE"):
+        lines.extend((
+            f'-  "{key}_TEST_REPOS" : "{urls(20000)}",',
+            f'+  "{key}_TEST_REPOS" : "{urls(20010)}",',
+            f'   "{key}_VERSION" : "15-SP6",',
+        ))
+    return "\n".join(lines)
+
+
+def main(repos: int = 5000, number: int = 5) -> None:
+    diff = synthetic_diff(repos)
+    args = Namespace(strategy="each", groups=2)
+
+    def legacy_run() -> list:
+        return [[int(i)] for [i] in legacy_bisect_groups(legacy_find_changed_issues(diff))]
+
+    def current_run() -> list:
+        # measure every repeat cold, a long-running process would not see these incidents again
+        openqa.Incident._interned.clear()  # noqa: SLF001
+        return openqa.bisect_groups(args, openqa.find_changed_issues(diff))
+
+    assert legacy_run() == current_run()
+    legacy = timeit.timeit(legacy_run, number=number) / number
+    current = timeit.timeit(current_run, number=number) / number
+    print(f"{repos} repos per variable ({len(diff) // 1024} KiB diff)")
+    print(f"legacy:  {legacy * 1000:8.2f} ms")
+    print(f"current: {current * 1000:8.2f} ms ({legacy / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
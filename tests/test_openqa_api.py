@@ -0,0 +1,122 @@
+# Copyright SUSE LLC
+"""tests for the in-process openQA API client."""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import pathlib
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+import requests
+
+import openqa_api
+
+USER_AGENT = "test-agent"
+
+
+@pytest.fixture
+def client_conf(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    (tmp_path / "client.conf").write_text("[openqa.example.com]\nkey = KEY\nsecret = SECRET\n", encoding="utf-8")
+    monkeypatch.setenv("OPENQA_CONFIG", str(tmp_path))
+    return tmp_path
+
+
+def fake_session(*responses: str) -> MagicMock:
+    session = requests.Session()
+    session.send = MagicMock(
+        side_effect=[Mock(text=text, raise_for_status=Mock()) for text in responses],
+    )
+    return session
+
+
+def test_read_credentials(client_conf: pathlib.Path) -> None:
+    assert openqa_api.read_credentials("https://openqa.example.com") == ("KEY", "SECRET")
+    assert openqa_api.config_files()[0] == client_conf / "client.conf"
+
+
+def test_read_credentials_missing(client_conf: pathlib.Path) -> None:
+    with patch("openqa_api.config_files", return_value=[client_conf / "client.conf"]):
+        assert openqa_api.read_credentials("https://other.example.com") == (None, None)
+
+
+def test_parse_settings() -> None:
+    assert openqa_api.parse_settings(["A=1", "B=", "C=x=y"]) == {"A": "1", "B": "", "C": "x=y"}
+    with pytest.raises(ValueError, match="Invalid setting"):
+        openqa_api.parse_settings(["A"])
+
+
+def test_comment_signed(client_conf: pathlib.Path) -> None:  # noqa: ARG001
+    session = fake_session('{"id": 1}')
+    client = openqa_api.OpenQAClient("openqa.example.com/tests/1", USER_AGENT, session=session)
+    assert client.host == "https://openqa.example.com"
+    with patch("openqa_api.time.time", return_value=1234.5):
+        assert client.comment(42, "foo bar") == '{"id": 1}'
+    request = session.send.call_args[0][0]
+    assert request.method == "POST"
+    assert request.url == "https://openqa.example.com/api/v1/jobs/42/comments"
+    assert request.body == "text=foo+bar"
+    assert request.headers["User-Agent"] == USER_AGENT
+    assert request.headers["X-API-Key"] == "KEY"
+    assert request.headers["X-API-Microtime"] == "1234.5"
+    expected = hmac.new(b"SECRET", b"/api/v1/jobs/42/comments1234.5", hashlib.sha1).hexdigest()
+    assert request.headers["X-API-Hash"] == expected
+
+
+def test_put_job() -> None:
+    session = fake_session("{}")
+    client = openqa_api.OpenQAClient("https://openqa.example.com", USER_AGENT, session=session)
+    client.put_job(42, {"priority": 50})
+    request = session.send.call_args[0][0]
+    assert request.method == "PUT"
+    assert json.loads(request.body) == {"priority": 50}
+
+
+def test_dry_run() -> None:
+    session = fake_session()
+    client = openqa_api.OpenQAClient("https://openqa.example.com", USER_AGENT, session=session, dry_run=True)
+    assert client.comment(42, "foo").startswith("Simulating: POST https://openqa.example.com/api/v1/jobs/42/comments")
+    assert client.clone(42, {"TEST": "bar"}) == "Simulating: clone https://openqa.example.com/tests/42 TEST=bar\n"
+    session.send.assert_not_called()
+
+
+def test_clone() -> None:
+    job = {
+        "job": {
+            "id": 42,
+            "group_id": 7,
+            "settings": {
+                "NAME": "00000042-foo",
+                "TEST": "foo",
+                "START_AFTER_TEST": "bar",
+                "MAINT_TEST_REPO": "http://repo",
+                "OS_TEST_ISSUES": "1,2",
+                "FOO": "a",
+            },
+        }
+    }
+    session = fake_session(json.dumps(job), '{"id": 43}')
+    client = openqa_api.OpenQAClient("https://openqa.example.com", USER_AGENT, session=session)
+    out = client.clone(42, {"TEST": "foo:investigate", "MAINT_TEST_REPO": "", "OS_TEST_ISSUES": "2", "FOO+": "b"})
+    assert json.loads(out) == {"42": 43}
+    request = session.send.call_args[0][0]
+    assert request.url == "https://openqa.example.com/api/v1/jobs"
+    posted = dict(pair.split("=") for pair in request.body.split("&"))
+    assert posted == {
+        "TEST": "foo%3Ainvestigate",
+        "OS_TEST_ISSUES": "2",
+        "FOO": "ab",
+        "_GROUP_ID": "7",
+        "CLONED_FROM": "https%3A%2F%2Fopenqa.example.com%2Ftests%2F42",
+        "is_clone_job": "1",
+    }
+
+
+def test_clone_without_group() -> None:
+    job = {"job": {"id": 42, "group_id": 7, "settings": {"TEST": "foo"}}}
+    session = fake_session(json.dumps(job), '{"ids": [43]}')
+    client = openqa_api.OpenQAClient("https://openqa.example.com", USER_AGENT, session=session)
+    assert json.loads(client.clone(42, {"_GROUP": "0"})) == {"42": 43}
+    assert "_GROUP_ID" not in session.send.call_args[0][0].body
@@ -6,10 +6,13 @@ from __future__ import annotations
 import contextlib
 import importlib.machinery
 import importlib.util
+import itertools
 import pathlib
+import sqlite3
 import sys
+from concurrent.futures import Future
 from typing import Any
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import ANY, MagicMock, Mock, patch
 
 import pytest
 from requests.exceptions import RequestException
@@ -28,29 +31,32 @@ loader.exec_module(bats_review)
 #
 
 
-class TestGetFile:
+class TestStreamFile:
     @patch("bats_review.session")
-    def test_get_file_success(self, mock_session: MagicMock) -> None:
+    def test_stream_file_success(self, mock_session: MagicMock) -> None:
         resp = Mock()
-        resp.text = "hello"
+        resp.iter_content.return_value = iter([b"hel", b"lo"])
         resp.raise_for_status = Mock()
         mock_session.get.return_value = resp
 
-        got = bats_review.get_file("http://example.com/foo.xml")
-        assert got == "hello"
+        got = list(bats_review.stream_file("http://example.com/foo.xml"))
+        assert got == [b"hel", b"lo"]
         mock_session.get.assert_called_once_with(
             "http://example.com/foo.xml",
             headers={"User-Agent": bats_review.USER_AGENT},
             timeout=bats_review.TIMEOUT,
+            stream=True,
         )
         resp.raise_for_status.assert_called_once()
+        resp.iter_content.assert_called_once_with(chunk_size=bats_review.CHUNK_SIZE)
+        resp.close.assert_called_once()
 
     @patch("bats_review.session")
     @patch("bats_review.log")
-    def test_get_file_request_exception(self, mock_log: MagicMock, mock_session: MagicMock) -> None:
+    def test_stream_file_request_exception(self, mock_log: MagicMock, mock_session: MagicMock) -> None:
         mock_session.get.side_effect = RequestException("network")
         with pytest.raises(SystemExit) as exc:
-            bats_review.get_file("http://example.com/foo.xml")
+            list(bats_review.stream_file("http://example.com/foo.xml"))
         assert exc.value.code == 1
         mock_log.error.assert_called_once()
 
@@ -87,10 +93,10 @@ class TestGetJob:
 
 
 class TestGrepFailures:
-    @patch("bats_review.get_file")
-    def test_grep_failures_success(self, mock_get_file: MagicMock) -> None:
+    @patch("bats_review.stream_file")
+    def test_grep_failures_success(self, mock_stream_file: MagicMock) -> None:
         # one passing, one failing testcase (with classname)
-        xml = """
+        xml = b"""
         <testsuite>
           <testcase classname="suite1" name="ok"/>
           <testcase classname="suite1" name="failing_test">
@@ -98,14 +104,28 @@ class TestGrepFailures:
           </testcase>
         </testsuite>
         """
-        mock_get_file.return_value = xml
+        mock_stream_file.return_value = iter([xml])
         result = bats_review.grep_failures("http://example.com/test.xml")
         assert result == {"suite1:failing_test"}
 
-    @patch("bats_review.get_file")
+    @patch("bats_review.stream_file")
+    def test_grep_failures_split_chunks(self, mock_stream_file: MagicMock) -> None:
+        xml = (
+            b'<testsuites><testsuite name="s">'
+            b'<testcase classname="c" name="a"><failure>x</failure></testcase>'
+            b'<testcase classname="c" name="b"/>'
+            b'<testcase name="d"><failure/></testcase>'
+            b"</testsuite></testsuites>"
+        )
+        # feed the document a few bytes at a time so elements span chunk boundaries
+        mock_stream_file.return_value = (xml[i : i + 7] for i in range(0, len(xml), 7))
+        result = bats_review.grep_failures("http://example.com/test.xml")
+        assert result == {"c:a", ":d"}
+
+    @patch("bats_review.stream_file")
     @patch("bats_review.log")
-    def test_grep_failures_malformed(self, mock_log: MagicMock, mock_get_file: MagicMock) -> None:
-        mock_get_file.return_value = "<this is not xml"
+    def test_grep_failures_malformed(self, mock_log: MagicMock, mock_stream_file: MagicMock) -> None:
+        mock_stream_file.return_value = iter([b"<this is not xml"])
         # script currently exits with code 1 on parse errors
         with pytest.raises(SystemExit) as exc:
             bats_review.grep_failures("http://example.com/test.xml")
@@ -113,42 +133,208 @@ class TestGrepFailures:
         mock_log.error.assert_called_once()
 
 
-class TestProcessLogs:
+class TestParseFailures:
+    def test_parse_failures_clears_testcases(self) -> None:
+        parser_cls = bats_review.ET.XMLPullParser
+        roots = []
+
+        def spy(*args: Any, **kwargs: Any) -> Any:
+            parser = parser_cls(*args, **kwargs)
+            orig_read_events = parser.read_events
+
+            def read_events() -> Any:
+                for event, elem in orig_read_events():
+                    if event == "start" and not roots:
+                        roots.append(elem)
+                    yield event, elem
+
+            parser.read_events = read_events
+            return parser
+
+        chunks = (
+            [b"<testsuite>"] + [b'<testcase classname="c" name="t%d"/>' % i for i in range(100)] + [b"</testsuite>"]
+        )
+        with patch("bats_review.ET.XMLPullParser", side_effect=spy):
+            assert bats_review.parse_failures(chunks) == set()
+        # the processed testcases were dropped from the tree instead of piling up
+        assert len(roots[0]) == 0
+
+
+def chain_job(jid: int, origin_id: int | None = None, test: str = "aardvark_testsuite") -> dict[str, Any]:
+    return {
+        "id": jid,
+        "origin_id": origin_id,
+        "settings": {"TEST": test, "DISTRI": "opensuse"},
+        "ulogs": ["test.xml"],
+    }
+
+
+@pytest.mark.parametrize(
+    ("test", "logs", "usable"),
+    [
+        ("aardvark_testsuite", 1, True),
+        ("container_host_aardvark_testsuite", 1, True),
+        ("podman_testsuite_crun", 4, True),
+        ("container_host_podman_testsuite_crun", 4, True),
+        ("podman_testsuite", 3, False),
+        ("ltp_syscalls", 1, False),
+    ],
+)
+def test_job_logs(test: str, logs: int, usable: bool) -> None:  # noqa: FBT001
+    job = chain_job(1, test=test)
+    job["ulogs"] = [f"{i}.xml" for i in range(logs)] + ["autoinst-log.txt"]
+    with patch("bats_review.log"):
+        urls = bats_review.job_logs("http://openqa", 1, job, bats_review.expected_logs(job))
+    assert urls == ([f"http://openqa/tests/1/file/{i}.xml" for i in range(logs)] if usable else [])
+
+
+class SyncExecutor:
+    """Executor running the submitted calls right away to make the scheduling deterministic."""
+
+    def submit(self, fn: Any, *args: Any) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self) -> None:
+        pass
+
+
+class TestCollectFailures:
     @patch("bats_review.grep_failures")
-    def test_process_logs_single_file(self, mock_grep: MagicMock) -> None:
-        mock_grep.return_value = {"a", "b"}
-        res = bats_review.process_logs(["http://example.com/a.xml"])
-        assert res == {"a", "b"}
-        mock_grep.assert_called_once_with("http://example.com/a.xml")
+    def test_collect_failures_all_jobs(self, mock_grep: MagicMock) -> None:
+        failures = {
+            "http://openqa/tests/3/file/test.xml": {"a", "b"},
+            "http://openqa/tests/2/file/test.xml": {"a", "c"},
+            "http://openqa/tests/1/file/test.xml": {"a"},
+        }
+        mock_grep.side_effect = failures.get
+        chain = [(3, chain_job(3, 2)), (2, chain_job(2, 1)), (1, chain_job(1))]
+        expected = bats_review.expected_logs(chain_job(3))
+        res = bats_review.collect_failures("http://openqa", iter(chain), expected)
+        assert sorted(res, key=len) == [{"a"}, {"a", "b"}, {"a", "c"}]
+        assert mock_grep.call_count == 3
+
+    @patch("bats_review.ThreadPoolExecutor", lambda **_: SyncExecutor())
+    @patch("bats_review.grep_failures")
+    def test_collect_failures_stops_early(self, mock_grep: MagicMock) -> None:
+        mock_grep.side_effect = lambda url: {url}
+        resolved = []
 
-    @patch("bats_review.ThreadPoolExecutor")
-    def test_process_logs_multiple_files(self, mock_executor_class: MagicMock) -> None:
-        # build fake executor that returns map -> iterator of sets
-        fake_executor = Mock()
-        fake_executor.map.return_value = iter([{"f1"}, {"f2"}])
-        mock_executor_class.return_value.__enter__.return_value = fake_executor
+        def chain() -> Any:
+            for jid in (5, 4, 3, 2, 1):
+                resolved.append(jid)
+                yield jid, chain_job(jid, jid - 1 or None)
 
-        files = ["one.xml", "two.xml"]
-        res = bats_review.process_logs(files)
-        assert res == {"f1", "f2"}
-        mock_executor_class.assert_called_once_with(max_workers=2)
-        fake_executor.map.assert_called_once()
+        expected = bats_review.expected_logs(chain_job(5))
+        with patch("bats_review.log"):
+            res = bats_review.collect_failures("http://openqa", chain(), expected)
+        # disjoint failures: the intersection is empty once two jobs are done
+        assert len(res) == 2
+        assert set.intersection(*res) == set()
+        assert resolved == [5, 4]
 
+    @patch("bats_review.grep_failures")
+    def test_collect_failures_cached(self, mock_grep: MagicMock, tmp_path: pathlib.Path) -> None:
+        mock_grep.return_value = {"a", "b"}
+        cache = bats_review.JobCache(str(tmp_path / "cache.sqlite"))
+        chain = [(2, chain_job(2, 1)), (1, chain_job(1))]
+        for jid, job in chain:
+            cache.put_job("http://openqa", jid, {**job, "state": "done"})
+        cache.put_failures("http://openqa", 1, {"a"})
+        res = bats_review.collect_failures("http://openqa", iter(chain), bats_review.expected_logs(chain_job(2)), cache)
+        assert sorted(res, key=len) == [{"a"}, {"a", "b"}]
+        mock_grep.assert_called_once_with("http://openqa/tests/2/file/test.xml")
+        assert cache.get_failures("http://openqa", 2) == {"a", "b"}
 
-class TestResolveCloneChain:
+    @patch("bats_review.grep_failures")
+    def test_collect_failures_skips_jobs_without_logs(self, mock_grep: MagicMock) -> None:
+        mock_grep.return_value = {"a"}
+        job = chain_job(2, 1)
+        job["ulogs"] = []
+        chain = [(2, job), (1, chain_job(1))]
+        with patch("bats_review.log"):
+            res = bats_review.collect_failures("http://openqa", iter(chain), bats_review.expected_logs(job))
+        assert res == [{"a"}]
+        mock_grep.assert_called_once_with("http://openqa/tests/1/file/test.xml")
+
+
+class TestJobCache:
+    def test_job_cache_roundtrip(self, tmp_path: pathlib.Path) -> None:
+        cache = bats_review.JobCache(str(tmp_path / "cache.sqlite"))
+        job = {"id": 1, "state": "done", "settings": {}}
+        cache.put_job("http://openqa", 1, job)
+        assert cache.get_job("http://openqa", 1) == job
+        assert cache.get_job("http://other", 1) is None
+        assert cache.get_failures("http://openqa", 1) is None
+        cache.put_failures("http://openqa", 1, {"b", "a"})
+        assert cache.get_failures("http://openqa", 1) == {"a", "b"}
+        cache.close()
+
+        # persisted across runs
+        cache = bats_review.JobCache(str(tmp_path / "cache.sqlite"))
+        assert cache.get_failures("http://openqa", 1) == {"a", "b"}
+        cache.close()
+
+    def test_job_cache_only_done(self, tmp_path: pathlib.Path) -> None:
+        cache = bats_review.JobCache(str(tmp_path / "cache.sqlite"))
+        cache.put_job("http://openqa", 1, {"id": 1, "state": "running"})
+        assert cache.get_job("http://openqa", 1) is None
+
+    def test_job_cache_evicts_least_recently_used(self, tmp_path: pathlib.Path) -> None:
+        cache = bats_review.JobCache(str(tmp_path / "cache.sqlite"), size=2)
+        with patch("bats_review.time.time", side_effect=range(100)):
+            cache.put_job("http://openqa", 1, {"id": 1, "state": "done"})
+            cache.put_job("http://openqa", 2, {"id": 2, "state": "done"})
+            # job 1 becomes the most recently used
+            assert cache.get_job("http://openqa", 1) is not None
+            cache.put_job("http://openqa", 3, {"id": 3, "state": "done"})
+            assert cache.get_job("http://openqa", 2) is None
+            assert cache.get_job("http://openqa", 1) is not None
+            assert cache.get_job("http://openqa", 3) is not None
+
+    def test_open_cache_unwritable(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "file").write_text("")
+        with patch("bats_review.log") as mock_log:
+            assert bats_review.open_cache(str(tmp_path / "file" / "cache.sqlite")) is None
+        mock_log.warning.assert_called_once()
+
+    def test_open_cache_corrupt(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "cache.sqlite").write_bytes(b"garbage" * 1000)
+        with patch("bats_review.log") as mock_log:
+            assert bats_review.open_cache(str(tmp_path / "cache.sqlite")) is None
+        mock_log.warning.assert_called_once()
+
+    def test_open_cache_disabled(self) -> None:
+        assert bats_review.open_cache(None) is None
+
+    def test_job_cache_locked(self, tmp_path: pathlib.Path) -> None:
+        cache = bats_review.JobCache(str(tmp_path / "cache.sqlite"))
+        cache.db = MagicMock()
+        cache.db.execute.side_effect = sqlite3.OperationalError("database is locked")
+        with patch("bats_review.log") as mock_log:
+            cache.put_job("http://openqa", 1, {"id": 1, "state": "done"})
+            cache.put_failures("http://openqa", 1, {"a"})
+            assert cache.get_job("http://openqa", 1) is None
+            assert cache.get_failures("http://openqa", 1) is None
+        assert mock_log.warning.call_count == 4
+
+
+class TestIterCloneChain:
     def setup_method(self) -> None:
         with contextlib.suppress(Exception):
             bats_review.get_job.cache_clear()
 
     @patch("bats_review.get_job")
-    def test_resolve_clone_chain_single(self, mock_get_job: MagicMock) -> None:
+    def test_iter_clone_chain_single(self, mock_get_job: MagicMock) -> None:
         mock_get_job.return_value = {"id": 123}
-        chain = bats_review.resolve_clone_chain("http://openqa", 123)
-        assert chain == [123]
+        chain = list(bats_review.iter_clone_chain("http://openqa", 123))
+        assert chain == [(123, {"id": 123})]
         mock_get_job.assert_called_once_with("http://openqa/api/v1/jobs/123/details")
 
     @patch("bats_review.get_job")
-    def test_resolve_clone_chain_multiple(self, mock_get_job: MagicMock) -> None:
+    @patch("bats_review.log")
+    def test_iter_clone_chain_multiple(self, mock_log: MagicMock, mock_get_job: MagicMock) -> None:
         def side(url: str) -> dict[str, Any] | None:
             jid = int(url.split("/")[-2])
             if jid == 123:
@@ -160,8 +346,29 @@ class TestResolveCloneChain:
             return None
 
         mock_get_job.side_effect = side
-        chain = bats_review.resolve_clone_chain("http://openqa", 123)
+        chain = [job_id for job_id, _ in bats_review.iter_clone_chain("http://openqa", 123)]
         assert chain == [123, 122, 121]
+        mock_log.info.assert_any_call("Processing clone chain: %s", "123 -> 122")
+        mock_log.info.assert_called_with("Processing clone chain: %s", "123 -> 122 -> 121")
+
+    @patch("bats_review.get_job")
+    def test_iter_clone_chain_lazy(self, mock_get_job: MagicMock) -> None:
+        mock_get_job.return_value = {"id": 123, "origin_id": 122}
+        chain = bats_review.iter_clone_chain("http://openqa", 123)
+        assert next(chain)[0] == 123
+        mock_get_job.assert_called_once_with("http://openqa/api/v1/jobs/123/details")
+
+    @patch("bats_review.get_job")
+    def test_iter_clone_chain_cached(self, mock_get_job: MagicMock, tmp_path: pathlib.Path) -> None:
+        cache = bats_review.JobCache(str(tmp_path / "cache.sqlite"))
+        cache.put_job("http://openqa", 122, {"id": 122, "state": "done", "origin_id": 121})
+        cache.put_job("http://openqa", 121, {"id": 121, "state": "done"})
+        mock_get_job.return_value = {"id": 123, "state": "done", "origin_id": 122}
+        chain = [job_id for job_id, _ in bats_review.iter_clone_chain("http://openqa", 123, cache)]
+        assert chain == [123, 122, 121]
+        # only the newest job is fetched and it is cached for the next run
+        mock_get_job.assert_called_once_with("http://openqa/api/v1/jobs/123/details")
+        assert cache.get_job("http://openqa", 123) is not None
 
 
 class TestMain:
@@ -171,43 +378,47 @@ class TestMain:
         with contextlib.suppress(Exception):
             bats_review.get_job.cache_clear()
 
-    @patch("bats_review.resolve_clone_chain")
+    @patch("bats_review.get_job")
     @patch("bats_review.log")
-    def test_main_no_clones(self, mock_log: MagicMock, mock_resolve: MagicMock) -> None:
-        mock_resolve.return_value = [123]  # single element -> "No clones"
+    def test_main_no_clones(self, mock_log: MagicMock, mock_get_job: MagicMock) -> None:
+        mock_get_job.return_value = chain_job(123)  # no origin_id -> "No clones"
         with pytest.raises(SystemExit) as exc:
             bats_review.main("http://openqa.example.com/tests/123", dry_run=True)
         assert exc.value.code == 0
         mock_log.info.assert_called_with("No clones. Exiting")
 
-    @patch("bats_review.resolve_clone_chain")
     @patch("bats_review.get_job")
-    @patch("bats_review.process_logs")
+    @patch("bats_review.log")
+    def test_main_unusable_cache(self, mock_log: MagicMock, mock_get_job: MagicMock, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "file").write_text("")
+        mock_get_job.return_value = chain_job(123)
+        with pytest.raises(SystemExit) as exc:
+            bats_review.main("http://openqa/tests/123", cache_file=str(tmp_path / "file" / "cache.sqlite"))
+        assert exc.value.code == 0
+        mock_log.warning.assert_called_once()
+        mock_log.info.assert_called_with("No clones. Exiting")
+
+    @patch("bats_review.get_job")
+    @patch("bats_review.grep_failures")
     @patch("bats_review.openqa_comment")
     def test_main_no_common_failures(
         self,
         mock_openqa_comment: MagicMock,
-        mock_process_logs: MagicMock,
+        mock_grep_failures: MagicMock,
         mock_get_job: MagicMock,
-        mock_resolve: MagicMock,
     ) -> None:
         """Two jobs in chain; each produces different failures -> no common failures.
 
         main should call openqa_comment(...) (we patch it) and log Tagging as PASSED.
         """
-        mock_resolve.return_value = [123, 122]
 
         def job_resp(url: str) -> dict[str, Any]:
             jid = int(url.split("/")[-2])
-            return {
-                "id": jid,
-                "settings": {"TEST": "aardvark_testsuite", "DISTRI": "opensuse"},
-                "ulogs": ["test.xml"],
-            }
+            return chain_job(jid, 122 if jid == 123 else None)
 
         mock_get_job.side_effect = job_resp
         # different failure sets for each job -> empty intersection
-        mock_process_logs.side_effect = [{"a"}, {"b"}]
+        mock_grep_failures.side_effect = lambda url: {"a"} if "/123/" in url else {"b"}
         mock_openqa_comment.return_value = "commented"
         # should return normally (no SystemExit) because script prints comment and returns
         with patch("bats_review.log"):
@@ -221,22 +432,19 @@ class TestMain:
         assert bats_review.PASSED in comment
         assert dry_run is True
 
-    @patch("bats_review.resolve_clone_chain")
     @patch("bats_review.get_job")
     @patch("bats_review.log")
-    def test_main_insufficient_logs(
-        self, mock_log: MagicMock, mock_get_job: MagicMock, mock_resolve: MagicMock
-    ) -> None:
+    def test_main_insufficient_logs(self, mock_log: MagicMock, mock_get_job: MagicMock) -> None:
         """If jobs do not have the expected number of logs (e.g. podman expects 4 but provides 2).
 
         main should log the 'only X logs' messages for each job and eventually exit(0).
         """
-        mock_resolve.return_value = [123, 122]
 
         def job_resp(url: str) -> dict[str, Any]:
             jid = int(url.split("/")[-2])
             return {
                 "id": jid,
+                "origin_id": 122 if jid == 123 else None,
                 "settings": {"TEST": "podman_testsuite", "DISTRI": "opensuse"},
                 "ulogs": ["a.xml", "b.xml"],  # only 2, but podman expects 4
             }
@@ -248,13 +456,155 @@ class TestMain:
         mock_log.info.assert_any_call("No logs found in chain. Exiting")
 
 
+class TestLogPool:
+    @patch("bats_review.grep_failures")
+    def test_log_pool_shares_jobs(self, mock_grep: MagicMock) -> None:
+        mock_grep.return_value = {"a"}
+        with bats_review.LogPool() as pool:
+            first = pool.submit("http://openqa", 1, ["http://openqa/tests/1/file/test.xml"])
+            second = pool.submit("http://openqa", 1, ["http://openqa/tests/1/file/test.xml"])
+        assert first is second
+        mock_grep.assert_called_once_with("http://openqa/tests/1/file/test.xml")
+
+    def test_log_pool_release(self) -> None:
+        with bats_review.LogPool() as pool:
+            future = Mock()
+            future.cancelled.return_value = False
+            pool.executor = Mock()
+            pool.executor.submit.return_value = future
+            pool.submit("http://openqa", 1, ["test.xml"])
+            pool.submit("http://openqa", 1, ["test.xml"])
+            pool.release("http://openqa", 1)
+            future.cancel.assert_not_called()
+            pool.release("http://openqa", 1)
+            future.cancel.assert_called_once()
+            assert not pool.jobs
+
+    @patch("bats_review.grep_failures")
+    def test_collect_failures_releases_jobs(self, mock_grep: MagicMock) -> None:
+        mock_grep.return_value = {"a"}
+        chain = [(123, chain_job(123, 122)), (122, chain_job(122))]
+        with bats_review.LogPool() as pool:
+            failures = bats_review.collect_failures(
+                "http://openqa", chain, bats_review.expected_logs(chain_job(123)), pool=pool
+            )
+            assert failures == [{"a"}, {"a"}]
+            assert not pool.jobs
+
+    @patch("bats_review.get_job")
+    @patch("bats_review.grep_failures")
+    def test_collect_failures_releases_jobs_on_error(self, mock_grep: MagicMock, mock_get_job: MagicMock) -> None:
+        mock_grep.return_value = {"a"}
+        mock_get_job.side_effect = SystemExit(1)
+        chain = bats_review.iter_clone_chain("http://openqa", 122)
+        with bats_review.LogPool() as pool:
+            first = [(123, chain_job(123, 122))]
+            with pytest.raises(SystemExit):
+                bats_review.collect_failures(
+                    "http://openqa", itertools.chain(first, chain), bats_review.expected_logs(chain_job(123)), pool=pool
+                )
+            assert not pool.jobs
+
+
+class TestBatch:
+    def setup_method(self) -> None:
+        with contextlib.suppress(Exception):
+            bats_review.get_job.cache_clear()
+
+    @patch("bats_review.session")
+    def test_get_overview(self, mock_session: MagicMock) -> None:
+        resp = Mock()
+        resp.json.return_value = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+        mock_session.get.return_value = resp
+        urls = bats_review.get_overview("https://openqa/tests/overview?build=1&result=failed")
+        assert urls == ["https://openqa/tests/1", "https://openqa/tests/2"]
+        assert mock_session.get.call_args[0][0] == "https://openqa/api/v1/jobs/overview?build=1&result=failed"
+
+    @patch("bats_review.get_overview")
+    @patch("bats_review.get_job")
+    @patch("bats_review.grep_failures")
+    @patch("bats_review.openqa_comment")
+    def test_main_batch_shared_ancestor(
+        self,
+        mock_openqa_comment: MagicMock,
+        mock_grep_failures: MagicMock,
+        mock_get_job: MagicMock,
+        mock_get_overview: MagicMock,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        # 3 & 4 are both clones of 2 which is a clone of 1; 5 has no clones
+        origins = {4: 2, 3: 2, 2: 1, 1: None, 5: None}
+        mock_get_job.side_effect = lambda url: chain_job(int(url.split("/")[-2]), origins[int(url.split("/")[-2])])
+        failures = {1: {"a", "b"}, 2: {"a"}, 3: {"a"}, 4: {"b"}}
+        mock_grep_failures.side_effect = lambda url: failures[int(url.split("/")[-3])]
+        mock_get_overview.return_value = ["http://openqa/tests/4", "http://openqa/tests/5"]
+        with patch("bats_review.log"), pytest.raises(SystemExit) as exc:
+            bats_review.main_batch(["http://openqa/tests/3", "http://openqa/tests/overview?build=1"], dry_run=True)
+        assert exc.value.code == 1
+        mock_get_overview.assert_called_once_with("http://openqa/tests/overview?build=1")
+        assert capsys.readouterr().out.splitlines()[-3:] == [
+            "http://openqa/tests/3: failed",
+            "http://openqa/tests/4: passed",
+            "http://openqa/tests/5: skipped",
+        ]
+        mock_openqa_comment.assert_called_once()
+        assert mock_openqa_comment.call_args[0] == (4, "http://openqa", bats_review.PASSED, True)
+        # the logs of the shared ancestor are processed only once
+        ancestor_calls = [c for c in mock_grep_failures.call_args_list if "/tests/2/" in c[0][0]]
+        assert len(ancestor_calls) == 1
+
+    @patch("bats_review.get_job")
+    @patch("bats_review.grep_failures")
+    def test_main_batch_unknown_testsuite(
+        self, mock_grep_failures: MagicMock, mock_get_job: MagicMock, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        # 4 is a clone of 3 which is not a BATS testsuite, 2 is a clone of 1 which fails to be fetched
+        jobs = {4: chain_job(4, 3, "ltp_syscalls"), 3: chain_job(3, None, "ltp_syscalls"), 2: chain_job(2, 1)}
+
+        def get_job(url: str) -> dict[str, Any]:
+            job_id = int(url.split("/")[-2])
+            if job_id not in jobs:
+                msg = f"no job {job_id}"
+                raise ValueError(msg)
+            return jobs[job_id]
+
+        mock_get_job.side_effect = get_job
+        mock_grep_failures.return_value = {"a"}
+        with patch("bats_review.log") as mock_log, pytest.raises(SystemExit) as exc:
+            bats_review.main_batch(["https://o/tests/4", "https://o/tests/2"], dry_run=True)
+        assert exc.value.code == 1
+        assert capsys.readouterr().out.splitlines()[-2:] == [
+            "https://o/tests/4: skipped",
+            "https://o/tests/2: error",
+        ]
+        mock_log.error.assert_called_once_with("Failed to review %s: %s", "https://o/tests/2", ANY)
+
+
+class TestOpenqaComment:
+    @patch("bats_review.call")
+    def test_openqa_comment_cli(self, mock_call: MagicMock) -> None:
+        bats_review.openqa_comment(123, "http://openqa", "foo", dry_run=True)
+        args = mock_call.call_args[0][0]
+        assert args[0] == "openqa-cli"
+        assert args[-2:] == ["jobs/123/comments", "text=foo"]
+
+    @patch("bats_review.NATIVE_CLIENT", new=True)
+    @patch("bats_review.call")
+    def test_openqa_comment_native(self, mock_call: MagicMock) -> None:
+        bats_review.api_client.cache_clear()
+        out = bats_review.openqa_comment(123, "http://openqa", "foo", dry_run=True)
+        assert out.startswith("Simulating: POST http://openqa/api/v1/jobs/123/comments")
+        assert bats_review.api_client("http://openqa", dry_run=True).session is bats_review.session
+        mock_call.assert_not_called()
+
+
 class TestParseArgs:
     """Tests for the parse_args function."""
 
     @patch("sys.argv", ["script.py", "http://example.com/tests/123"])
     def test_parse_args_success(self) -> None:
         args = bats_review.parse_args()
-        assert args.url == "http://example.com/tests/123"
+        assert args.url == ["http://example.com/tests/123"]
 
     @patch("sys.argv", ["script.py"])
     def test_parse_args_missing_url(self) -> None:
@@ -302,19 +652,23 @@ class TestIntegration:
                     }
                 }
             elif "/tests/123/file/test.xml" in url:
-                m.text = """
+                m.iter_content.return_value = iter([
+                    b"""
                     <testsuite>
                       <testcase classname="c" name="ok"/>
                       <testcase classname="c" name="failA"><failure>err</failure></testcase>
                     </testsuite>
                 """
+                ])
             elif "/tests/122/file/test.xml" in url:
-                m.text = """
+                m.iter_content.return_value = iter([
+                    b"""
                     <testsuite>
                       <testcase classname="c" name="ok"/>
                       <testcase classname="c" name="failB"><failure>err</failure></testcase>
                     </testsuite>
                 """
+                ])
             else:
                 # default (should not happen in this test)
                 m.json.return_value = {"job": {"id": 999, "ulogs": []}}
@@ -0,0 +1,255 @@
+# Copyright SUSE LLC
+"""tests for openqa-get-job-runtime-stats."""
+
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.util
+import pathlib
+import runpy
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+import requests
+
+rootpath = pathlib.Path(__file__).parent.parent.resolve()
+script = f"{rootpath}/openqa-get-job-runtime-stats"
+
+loader = importlib.machinery.SourceFileLoader("runtime_stats", script)
+spec = importlib.util.spec_from_loader(loader.name, loader)
+runtime_stats = importlib.util.module_from_spec(spec)
+loader.exec_module(runtime_stats)
+
+QUANTILES = {"min": 0, "median": 50, "p90": 90, "p99": 99, "max": 100}
+
+
+def random_groups(rng: np.random.Generator, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return group codes and values with an empty and a single-element group among random sized ones."""
+    sizes = rng.integers(2, 20, size=n)
+    sizes[0] = 0
+    sizes[1] = 1
+    groups = np.repeat(np.arange(n, dtype=np.int32), sizes)
+    rng.shuffle(groups)
+    return groups, rng.uniform(0, 1000, size=len(groups)).round(1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_group_percentile(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    groups, values = random_groups(rng, 12)
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+    counts = np.bincount(groups, minlength=12)
+    starts = np.searchsorted(groups, np.arange(12))
+    for q in [0, 25, 50, 90, 99, 100, rng.uniform(0, 100)]:
+        res = runtime_stats.group_percentile(values, starts, counts, q)
+        assert np.isnan(res[0])
+        for g in range(1, 12):
+            assert res[g] == pytest.approx(np.percentile(values[groups == g], q))
+
+
+def test_group_percentile_no_values() -> None:
+    res = runtime_stats.group_percentile(np.zeros(0), np.zeros(3, dtype=np.int64), np.zeros(3, dtype=np.int64), 50)
+    assert np.isnan(res).all()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_runtime_stats(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    groups, values = random_groups(rng, 10)
+    ids = rng.permutation(len(values)).astype(np.int64) + 1000
+    stats = runtime_stats.runtime_stats(groups, values, 10, ids)
+    assert stats["count"][0] == 0
+    for name in ("average", "stdev", "latest", *QUANTILES):
+        assert np.isnan(stats[name][0]), name
+    for g in range(1, 10):
+        group = values[groups == g]
+        assert stats["count"][g] == len(group)
+        assert stats["average"][g] == pytest.approx(np.mean(group))
+        assert stats["stdev"][g] == pytest.approx(np.std(group))
+        for name, q in QUANTILES.items():
+            assert stats[name][g] == pytest.approx(np.percentile(group, q)), name
+        assert stats["latest"][g] == group[np.argmax(ids[groups == g])]
+    # a single value has no deviation
+    assert stats["stdev"][1] == 0
+
+
+def test_runtime_stats_no_values() -> None:
+    empty = np.zeros(0)
+    stats = runtime_stats.runtime_stats(empty.astype(np.int32), empty, 2, empty.astype(np.int64))
+    assert list(stats["count"]) == [0, 0]
+    assert np.isnan(stats["median"]).all()
+    assert np.isnan(stats["latest"]).all()
+
+
+def job(job_id: int, test: str, result: str = "passed", runtime: int = 100) -> dict:
+    return {
+        "id": job_id,
+        "test": test,
+        "state": "done",
+        "result": result,
+        "t_started": "2024-01-01T10:00:00",
+        "t_finished": f"2024-01-01T10:{runtime // 60:02d}:{runtime % 60:02d}",
+    }
+
+
+def test_job_store_roundtrip(tmp_path: pathlib.Path) -> None:
+    store = runtime_stats.JobStore(str(tmp_path / "cache" / "store.sqlite"))
+    jobs = [job(1, "foo"), job(2, "foo", "failed"), {**job(3, "bar"), "state": "running", "t_finished": None}]
+    store.put_jobs("https://openqa", jobs)
+    store.put_modules("https://openqa", 1, [["boot", 12.5], ["shutdown", 3]])
+    store.close()
+
+    store = runtime_stats.JobStore(str(tmp_path / "cache" / "store.sqlite"))
+    assert store.get_jobs("https://openqa", [1, 2, 3, 4]) == {j["id"]: j for j in jobs}
+    assert store.get_jobs("https://other", [1]) == {}
+    assert store.get_modules("https://openqa", [1, 2]) == {1: [["boot", 12.5], ["shutdown", 3]]}
+    # jobs are replaced when fetched again
+    store.put_jobs("https://openqa", [job(3, "bar")])
+    assert store.get_jobs("https://openqa", [3])[3]["state"] == "done"
+    store.close()
+
+
+def test_offline(tmp_path: pathlib.Path, capsys: pytest.CaptureFixture) -> None:
+    path = str(tmp_path / "store.sqlite")
+    store = runtime_stats.JobStore(path)
+    store.put_jobs("https://openqa", [job(1, "foo", runtime=60), job(2, "foo", runtime=120), job(3, "foo", "failed")])
+    store.put_modules("https://openqa", 1, [["boot", 10]])
+    store.put_modules("https://openqa", 2, [["boot", 20]])
+    store.close()
+
+    argv = ["openqa-get-job-runtime-stats", "--store", path, "--offline", "-m", "https://openqa/tests/1..4"]
+    with patch("sys.argv", argv), patch("requests.Session.get", side_effect=AssertionError("no request offline")):
+        runpy.run_path(script, run_name="__main__")
+    out = capsys.readouterr().out
+    assert "Loaded 3 jobs from the store, 1 jobs not found" in out
+    assert "Test 'foo'" in out
+    assert "Failure rate:                      33.3% (1/3)" in out
+    assert "Median runtime:                    90.00 s" in out
+    assert "boot" in out
+    assert "15.00" in out
+
+
+def test_offline_requires_store() -> None:
+    argv = ["openqa-get-job-runtime-stats", "--no-store", "--offline", "https://openqa/tests/1"]
+    with patch("sys.argv", argv), pytest.raises(SystemExit) as e:
+        runpy.run_path(script, run_name="__main__")
+    assert e.value.code == 2
+
+
+class FakeSession:
+    """Session answering job and job list queries from jobs by id.
+
+    The ids in fail can't be fetched, the ids in unlisted are only missing in job lists.
+    """
+
+    def __init__(self, jobs: dict[int, dict], fail: set[int] | None = None, unlisted: set[int] | None = None) -> None:
+        self.jobs = jobs
+        self.fail = fail or set()
+        self.unlisted = self.fail | (unlisted or set())
+        self.urls: list[str] = []
+
+    def get(self, url: str, **_kwargs: object) -> Mock:
+        self.urls.append(url)
+        response = Mock()
+        if "?ids=" in url:
+            ids = [int(i) for i in url.split("?ids=")[1].split(",")]
+            # the job list is sorted by descending id like openQA does
+            found = sorted((i for i in ids if i in self.jobs and i not in self.unlisted), reverse=True)
+            response.json.return_value = {"jobs": [self.jobs[i] for i in found]}
+            return response
+        job_id = int(url.rsplit("/", 1)[1])
+        if job_id in self.fail or job_id not in self.jobs:
+            msg = f"404 Not Found: {url}"
+            raise requests.HTTPError(msg)
+        response.json.return_value = {"job": self.jobs[job_id]}
+        return response
+
+
+def test_fetch_jobs_order() -> None:
+    jobs = {i: job(i, f"test{i}") for i in range(1, 21)}
+    links = runtime_stats.get_job_api_urls("https://openqa", jobs)
+    table = runtime_stats.JobTable()
+    with patch.object(runtime_stats, "new_session", return_value=FakeSession(jobs)):
+        fetched, failed = runtime_stats.fetch_jobs(links, table, workers=8, quiet=True)
+    assert (fetched, failed) == (20, [])
+    assert table.columns()[1].tolist() == list(range(1, 21))
+    assert list(table.tests) == [f"test{i}" for i in range(1, 21)]
+
+
+def test_fetch_jobs_failure(capsys: pytest.CaptureFixture) -> None:
+    jobs = {i: job(i, "foo") for i in range(1, 6)}
+    links = runtime_stats.get_job_api_urls("https://openqa", jobs)
+    table = runtime_stats.JobTable()
+    with patch.object(runtime_stats, "new_session", return_value=FakeSession(jobs, fail={3})):
+        fetched, failed = runtime_stats.fetch_jobs(links, table, workers=4, quiet=True)
+    assert (fetched, failed) == (4, ["https://openqa/api/v1/jobs/3"])
+    assert table.columns()[1].tolist() == [1, 2, 4, 5]
+    assert "ERROR: https://openqa/api/v1/jobs/3: 404 Not Found" in capsys.readouterr().err
+
+
+def test_failed_jobs_exit(tmp_path: pathlib.Path, capsys: pytest.CaptureFixture) -> None:
+    session = FakeSession({1: job(1, "foo"), 2: job(2, "foo")}, fail={2})
+    argv = [
+        "openqa-get-job-runtime-stats",
+        "--store",
+        str(tmp_path / "store.sqlite"),
+        "-c",
+        "1",
+        "https://openqa/tests/1..2",
+    ]
+    with patch("sys.argv", argv), patch("openqa_api.new_session", return_value=session), pytest.raises(SystemExit) as e:
+        runpy.run_path(script, run_name="__main__")
+    assert e.value.code == "Failed to fetch 1 job queries: https://openqa/api/v1/jobs/2"
+    assert "Test 'foo'" in capsys.readouterr().out
+
+
+def test_get_job_list_urls() -> None:
+    assert runtime_stats.get_job_list_urls("https://openqa", range(1, 6), chunk_size=2) == [
+        "https://openqa/api/v1/jobs?ids=1,2",
+        "https://openqa/api/v1/jobs?ids=3,4",
+        "https://openqa/api/v1/jobs?ids=5",
+    ]
+    assert runtime_stats.get_job_list_urls("https://openqa", [], chunk_size=2) == []
+
+
+def test_fetch_job_list_fallback() -> None:
+    jobs = {i: {**job(i, "foo"), "settings": {"BIG": "x"}} for i in range(1, 5)}
+    # job 3 is missing in the job list and fetched on its own
+    session = FakeSession(jobs, unlisted={3})
+    res = runtime_stats.fetch_job(session, "https://openqa/api/v1/jobs?ids=1,2,3,4")
+    assert res == [job(i, "foo") for i in range(1, 5)]
+    assert session.urls == ["https://openqa/api/v1/jobs?ids=1,2,3,4", "https://openqa/api/v1/jobs/3"]
+
+
+def test_job_table_sort() -> None:
+    table = runtime_stats.JobTable()
+    table.add([job(5, "b"), job(4, "c")], "https://openqa")
+    table.add([job(1, "a"), job(2, "b"), job(3, "a")], "https://openqa")
+    table.sort([5, 4, 1, 2, 3])
+    _, job_id, test = table.columns()[:3]
+    assert job_id.tolist() == [1, 2, 3, 4, 5]
+    assert list(table.tests) == ["a", "b", "c"]
+    assert [list(table.tests)[t] for t in test.tolist()] == ["a", "b", "a", "c", "b"]
+    runtime_stats.JobTable().sort([])
+
+
+def test_requested_order(tmp_path: pathlib.Path, capsys: pytest.CaptureFixture) -> None:
+    path = str(tmp_path / "store.sqlite")
+    store = runtime_stats.JobStore(path)
+    store.put_jobs("https://openqa", [job(4, "test4")])
+    store.close()
+    jobs = {i: job(i, f"test{i}") for i in range(1, 8)}
+    # job 2 is missing in the job list and fetched on its own
+    session = FakeSession(jobs, unlisted={2})
+    argv = ["openqa-get-job-runtime-stats", "--store", path, "-q", "-c", "3", "https://openqa/tests/1..7"]
+    with patch("sys.argv", argv), patch("openqa_api.new_session", return_value=session):
+        runpy.run_path(script, run_name="__main__")
+    tests = [line for line in capsys.readouterr().out.splitlines() if line.startswith("Test '")]
+    assert tests == [f"Test 'test{i}'" for i in range(1, 8)]
+    assert sorted(session.urls) == [
+        "https://openqa/api/v1/jobs/2",
+        "https://openqa/api/v1/jobs?ids=1,2,3",
+        "https://openqa/api/v1/jobs?ids=5,6,7",
+    ]
@@ -0,0 +1,309 @@
+# Copyright SUSE LLC
+"""tests for openqa-list-incidents."""
+
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.util
+import os
+import pathlib
+import random
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+rootpath = pathlib.Path(__file__).parent.parent.resolve()
+loader = importlib.machinery.SourceFileLoader("list_incidents", f"{rootpath}/openqa-list-incidents")
+spec = importlib.util.spec_from_loader(loader.name, loader)
+list_incidents = importlib.util.module_from_spec(spec)
+loader.exec_module(list_incidents)
+
+SMELT = "https://smelt.suse.de/api/v1/overview"
+
+
+class FakeSession:
+    """Session answering the GET requests with the JSON returned by the handler for the URL and parameters."""
+
+    def __init__(self, handler: Callable[[str, dict], Any]) -> None:
+        self.handler = handler
+        self.lock = threading.Lock()
+        self.calls: list[tuple[str, dict]] = []
+
+    def get(self, url: str, params: dict | None = None, **_kwargs: object) -> Mock:
+        with self.lock:
+            self.calls.append((url, params or {}))
+        data = self.handler(url, params or {})
+        if data is None:
+            msg = f"404 Not Found: {url}"
+            raise requests.HTTPError(msg)
+        return Mock(json=Mock(return_value=data))
+
+
+@pytest.fixture(autouse=True)
+def state(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(list_incidents, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(list_incidents, "fetched_titles", set())
+    for func in (list_incidents.get_all_incidents, list_incidents.get_incident_index, list_incidents.get_issue_titles):
+        func.cache_clear()
+
+
+def use_session(monkeypatch: pytest.MonkeyPatch, handler: Callable[[str, dict], Any]) -> FakeSession:
+    session = FakeSession(handler)
+    monkeypatch.setattr(list_incidents, "session", session)
+    return session
+
+
+def incident(incident_id: int, package: str, request_id: int = 1, refs: list[str] | None = None) -> dict:
+    return {
+        "incident": {
+            "incident_id": incident_id,
+            "project": f"SUSE:Maintenance:{incident_id}",
+            "references": [
+                {"name": f"bsc#{ref}", "url": f"https://bugzilla.suse.com/show_bug.cgi?id={ref}"} for ref in refs or []
+            ],
+        },
+        "request_id": request_id,
+        "status": {"name": "testing"},
+        "packages": [package],
+    }
+
+
+def test_get_page_urls_page() -> None:
+    data = {"next": f"{SMELT}/testing/?page=2", "count": 25, "results": [{}] * 10}
+    assert list_incidents.get_page_urls(data) == [f"{SMELT}/testing/?page=2", f"{SMELT}/testing/?page=3"]
+
+
+def test_get_page_urls_offset() -> None:
+    data = {"next": f"{SMELT}/testing/?limit=10&offset=10", "count": 25, "results": [{}] * 10}
+    assert list_incidents.get_page_urls(data) == [
+        f"{SMELT}/testing/?limit=10&offset=10",
+        f"{SMELT}/testing/?limit=10&offset=20",
+    ]
+
+
+def test_get_page_urls_unknown() -> None:
+    assert list_incidents.get_page_urls({"next": None, "count": 5, "results": [{}] * 5}) == []
+    # cursor pagination can't be computed and is followed page by page
+    assert list_incidents.get_page_urls({"next": f"{SMELT}/testing/?cursor=abc", "count": 25, "results": [{}]}) is None
+    assert list_incidents.get_page_urls({"next": f"{SMELT}/testing/?page=2", "count": None, "results": [{}]}) is None
+
+
+@pytest.mark.parametrize("style", ["page", "offset", "cursor"])
+def test_get_incidents_order(monkeypatch: pytest.MonkeyPatch, style: str) -> None:
+    pages = 12
+    delays = random.Random(style).sample(range(pages), pages)  # noqa: S311
+
+    def handler(url: str, _params: dict) -> dict:
+        query = url.partition("?")[2]
+        number = int(query.rsplit("=", 1)[1]) if query else 1
+        if style == "offset" and query:
+            number = number // 10 + 1
+        # later pages are answered first
+        time.sleep(delays[number - 1] / 1000)
+        if number == pages:
+            next_url = None
+        elif style == "page":
+            next_url = f"{SMELT}/testing/?page={number + 1}"
+        elif style == "offset":
+            next_url = f"{SMELT}/testing/?limit=10&offset={number * 10}"
+        else:
+            next_url = f"{SMELT}/testing/?cursor={number + 1}"
+        return {"next": next_url, "count": pages * 10, "results": [(number, i) for i in range(10)]}
+
+    use_session(monkeypatch, handler)
+    results = list_incidents.get_incidents("testing")
+    assert results == [(number, i) for number in range(1, pages + 1) for i in range(10)]
+
+
+def test_cache_ttl() -> None:
+    assert list_incidents.read_cache("data.json", 60) is None
+    list_incidents.write_cache("data.json", {"a": [1]})
+    assert list_incidents.read_cache("data.json", 60) == {"a": [1]}
+    old = time.time() - 120
+    os.utime(pathlib.Path(list_incidents.CACHE_DIR, "data.json"), (old, old))
+    assert list_incidents.read_cache("data.json", 60) is None
+    assert list_incidents.read_cache("data.json", 180) == {"a": [1]}
+
+
+def test_cache_oserror(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture) -> None:
+    (tmp_path / "file").write_text("")
+    monkeypatch.setattr(list_incidents, "CACHE_DIR", str(tmp_path / "file" / "cache"))
+    list_incidents.write_cache("data.json", {})
+    assert "WARNING:" in capsys.readouterr().err
+    assert list_incidents.read_cache("data.json", 60) is None
+
+
+def test_cache_corrupt() -> None:
+    pathlib.Path(list_incidents.CACHE_DIR).mkdir()
+    pathlib.Path(list_incidents.CACHE_DIR, "data.json").write_text("{", encoding="utf-8")
+    assert list_incidents.read_cache("data.json", 60) is None
+
+
+def smelt_routes(routes: dict[str, list[dict]]) -> Callable[[str, dict], dict]:
+    def handler(url: str, _params: dict) -> dict:
+        results = routes[url.removeprefix(f"{SMELT}/").strip("/")]
+        return {"next": None, "count": len(results), "results": results}
+
+    return handler
+
+
+def test_get_all_incidents_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    routes = {"tested_declined": [incident(1, "a")], "tested_ready": [incident(2, "b")], "testing": [incident(3, "c")]}
+    session = use_session(monkeypatch, smelt_routes(routes))
+    incidents = list_incidents.get_all_incidents()
+    assert [i["incident"]["incident_id"] for i in incidents] == [1, 2, 3]
+    assert len(session.calls) == 3
+
+    # a new run is served from the disk cache until it expires
+    list_incidents.get_all_incidents.cache_clear()
+    assert list_incidents.get_all_incidents() == incidents
+    assert len(session.calls) == 3
+
+
+def test_get_all_incidents_unwritable_cache(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    (tmp_path / "file").write_text("")
+    monkeypatch.setattr(list_incidents, "CACHE_DIR", str(tmp_path / "file" / "cache"))
+    routes = {"tested_declined": [], "tested_ready": [], "testing": [incident(3, "c")]}
+    use_session(monkeypatch, smelt_routes(routes))
+    assert [i["incident"]["incident_id"] for i in list_incidents.get_all_incidents()] == [3]
+    assert "WARNING:" in capsys.readouterr().err
+
+
+def test_get_incident_index_duplicates(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(list_incidents, "CACHE_TTL", 0)
+    routes = {
+        "tested_declined": [incident(1, "a", request_id=10)],
+        "tested_ready": [incident(2, "b")],
+        "testing": [incident(1, "a", request_id=11)],
+    }
+    use_session(monkeypatch, smelt_routes(routes))
+    index = list_incidents.get_incident_index()
+    assert [i["request_id"] for i in index[1]] == [10, 11]
+    assert len(index[2]) == 1
+    assert list_incidents.fetch_incident(1)["request_id"] == 10
+    assert list_incidents.fetch_incident(3) is None
+
+
+def issues_handler(url: str, params: dict) -> dict:
+    if url == "https://bugzilla.suse.com/rest/bug":
+        return {"bugs": [{"id": int(i), "summary": f"bug {i}"} for i in params["id"]]}
+    if url == "https://jira.suse.com/rest/api/2/search":
+        keys = params["jql"].removeprefix("key in (").removesuffix(")").split(",")
+        return {"issues": [{"key": key, "fields": {"summary": f"issue {key}"}} for key in keys]}
+    return None
+
+
+def test_fetch_titles(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(list_incidents, "BUGZILLA_TOKEN", "token")
+    monkeypatch.setattr(list_incidents, "JIRA_TOKEN", "token")
+    monkeypatch.setattr(list_incidents, "MAX_ISSUES", 2)
+    session = use_session(monkeypatch, issues_handler)
+    bugs = [f"https://bugzilla.suse.com/show_bug.cgi?id={i}" for i in range(1, 6)]
+    jiras = [f"https://jira.suse.com/browse/SLE-{i}" for i in range(1, 4)]
+    list_incidents.fetch_titles([*bugs, *jiras, ""])
+
+    # every chunk request carries only its own ids
+    bug_chunks = [params["id"] for url, params in session.calls if "bugzilla" in url]
+    assert all(len(chunk) <= 2 for chunk in bug_chunks)
+    assert sorted(i for chunk in bug_chunks for i in chunk) == [str(i) for i in range(1, 6)]
+    assert len(bug_chunks) == 3
+    jira_chunks = [
+        params["jql"].removeprefix("key in (").removesuffix(")").split(",")
+        for url, params in session.calls
+        if "jira" in url
+    ]
+    assert all(len(chunk) <= 2 for chunk in jira_chunks)
+    assert sorted(key for chunk in jira_chunks for key in chunk) == ["SLE-1", "SLE-2", "SLE-3"]
+    assert len(jira_chunks) == 2
+    assert list_incidents.get_title(bugs[2]) == "bug 3"
+    assert list_incidents.get_title(jiras[1]) == "issue SLE-2"
+
+    # a second lookup in the same run and in a new run is served from the cache
+    list_incidents.fetch_titles(bugs)
+    list_incidents.get_issue_titles.cache_clear()
+    list_incidents.fetched_titles.clear()
+    list_incidents.fetch_titles([*bugs, *jiras])
+    assert len(session.calls) == 5
+    assert list_incidents.get_title(jiras[0]) == "issue SLE-1"
+
+
+def test_fetch_titles_expired(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(list_incidents, "BUGZILLA_TOKEN", "token")
+    session = use_session(monkeypatch, issues_handler)
+    bug = "https://bugzilla.suse.com/show_bug.cgi?id=1"
+    list_incidents.fetch_titles([bug])
+    list_incidents.get_issue_titles.cache_clear()
+    list_incidents.fetched_titles.clear()
+    later = time.time() + 2 * list_incidents.TITLE_CACHE_TTL
+    monkeypatch.setattr(list_incidents.time, "time", lambda: later)
+    list_incidents.fetch_titles([bug])
+    assert len(session.calls) == 2
+
+
+def openqa_handler(
+    jobs: dict[int, list[int]], overview: list[int], incidents: list[dict]
+) -> Callable[[str, dict], Any]:
+    """Handle openQA jobs with the given incidents, an overview query matching some of them, SMELT and Bugzilla."""
+    smelt = smelt_routes({"tested_declined": [], "tested_ready": [], "testing": incidents})
+
+    def handler(url: str, params: dict) -> Any:
+        if url.startswith(SMELT):
+            return smelt(url, params)
+        if url == "https://openqa/api/v1/jobs/overview":
+            return [{"id": job_id} for job_id in overview]
+        if url.startswith("https://openqa/api/v1/jobs/"):
+            job_id = int(url.rsplit("/", 1)[1])
+            settings = {"OS_TEST_ISSUES": ",".join(map(str, jobs[job_id])), "DISTRI": "sle"}
+            return {"job": {"id": job_id, "settings": settings}}
+        return issues_handler(url, params)
+
+    return handler
+
+
+def test_print_incidents_verbose(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture) -> None:
+    monkeypatch.setattr(list_incidents, "BUGZILLA_TOKEN", "token")
+    incidents = [incident(100, "foo", refs=["1", "2"]), incident(200, "bar", refs=["3"])]
+    session = use_session(monkeypatch, openqa_handler({1: [100, 200]}, [], incidents))
+    list_incidents.print_incidents("https://openqa/tests/1", verbose=True)
+    out = capsys.readouterr().out.splitlines()
+    assert [line.split() for line in out] == [
+        ["S:M:200:1", "bar", "https://bugzilla.suse.com/show_bug.cgi?id=3", "bug", "3"],
+        ["S:M:100:1", "foo", "https://bugzilla.suse.com/show_bug.cgi?id=1", "bug", "1"],
+        ["https://bugzilla.suse.com/show_bug.cgi?id=2", "bug", "2"],
+    ]
+    # the titles of all printed incidents are fetched at once
+    bug_calls = [params["id"] for url, params in session.calls if "bugzilla" in url]
+    assert [sorted(ids) for ids in bug_calls] == [["1", "2", "3"]]
+
+
+def test_print_incidents_many_jobs(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture) -> None:
+    monkeypatch.setattr(list_incidents, "CACHE_TTL", 0)
+    incidents = [incident(100, "foo"), incident(200, "bar")]
+    # jobs 1 & 2 share incident 100, the overview query matches jobs 2 & 3
+    session = use_session(monkeypatch, openqa_handler({1: [100], 2: [100], 3: [200]}, [2, 3], incidents))
+    list_incidents.print_incidents(["https://openqa/tests/1", "openqa/tests/overview?build=1", "https://openqa/t1"])
+    out = capsys.readouterr().out.splitlines()
+    assert [line.split() for line in out] == [
+        ["S:M:200:1", "bar"],
+        ["jobs:", "t3"],
+        ["S:M:100:1", "foo"],
+        ["jobs:", "t1", "t2"],
+    ]
+    # every job is fetched once
+    job_urls = [url for url, _ in session.calls if url.startswith("https://openqa/api/v1/jobs/")]
+    assert sorted(job_urls) == [f"https://openqa/api/v1/jobs/{i}" for i in (1, 2, 3, "overview")]
+
+
+def test_print_incidents_all_jobs(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture) -> None:
+    monkeypatch.setattr(list_incidents, "CACHE_TTL", 0)
+    use_session(monkeypatch, openqa_handler({1: [100], 2: [100]}, [], [incident(100, "foo")]))
+    list_incidents.print_incidents(["https://openqa/tests/1", "https://openqa/tests/2"])
+    # the jobs are not listed when all of them contain the incident
+    assert [line.split() for line in capsys.readouterr().out.splitlines()] == [["S:M:100:1", "foo"]]
@@ -0,0 +1,255 @@
+# Copyright SUSE LLC
+"""tests for openqa-post-similarity."""
+
+from __future__ import annotations
+
+import gzip
+import importlib.machinery
+import importlib.util
+import itertools
+import logging
+import operator
+import pathlib
+import random
+import sys
+from typing import ClassVar
+
+import pytest
+
+Levenshtein = pytest.importorskip("Levenshtein")
+pytest.importorskip("pyecharts")
+pytest.importorskip("openqa_client")
+pytest.importorskip("tqdm")
+
+rootpath = pathlib.Path(__file__).parent.parent.resolve()
+
+loader = importlib.machinery.SourceFileLoader("post_similarity", f"{rootpath}/openqa-post-similarity")
+spec = importlib.util.spec_from_loader(loader.name, loader)
+similarity = importlib.util.module_from_spec(spec)
+# the worker processes look up their functions by module name
+sys.modules[loader.name] = similarity
+loader.exec_module(similarity)
+
+WORDS = ["foo", "bar", "baz", "qux", "died", "at", "line"]
+log = logging.getLogger(__name__)
+
+
+@pytest.fixture(autouse=True)
+def state(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Run every test in an empty directory with empty global state."""
+    monkeypatch.chdir(tmp_path)
+    for name in ("id_msg", "result", "neighbors", "shared"):
+        monkeypatch.setattr(similarity, name, type(getattr(similarity, name))())
+
+
+def random_messages(seed: int, number: int) -> list[str]:
+    rng = random.Random(seed)  # noqa: S311
+    return ["Test died: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))) for _ in range(number)]
+
+
+def full_neighbors(number: int) -> dict[str, list[tuple[str, int]]]:
+    """Return the neighbors of every job by an exhaustive search."""
+    jobs = list(similarity.id_msg.items())
+    neighbors = {}
+    for job_id, msg in jobs:
+        distances = [(other, Levenshtein.distance(msg, other_msg)) for other, other_msg in jobs if other != job_id]
+        neighbors[job_id] = sorted(distances, key=operator.itemgetter(1))[:number]
+    return neighbors
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_bk_tree_nearest(seed: int) -> None:
+    rng = random.Random(seed)  # noqa: S311
+    msgs = list(dict.fromkeys(random_messages(seed, 80)))
+    weights = {msg: rng.randint(1, 3) for msg in msgs}
+    tree = similarity.BKTree()
+    for msg in msgs:
+        tree.add(msg)
+    for query in [*msgs[:10], "Test died: something else"]:
+        for need in (1, 4, 15):
+            found = tree.nearest(query, weights.get, need)
+            assert found == sorted(found)
+            # all messages closer than the farthest one found, and all tied with it, weighing at least need
+            brute = sorted((Levenshtein.distance(query, msg), msg) for msg in msgs)
+            total = 0
+            for k, (d, _) in enumerate(brute):
+                total += weights[brute[k][1]]
+                if total >= need:
+                    cutoff = d
+                    break
+            assert found == [(d, msg) for d, msg in brute if d <= cutoff]
+
+
+def test_bk_tree_empty() -> None:
+    tree = similarity.BKTree()
+    assert tree.nearest("Test died", len, 3) == []
+    tree.set_reach({})
+    assert tree.covering("Test died", {}) == []
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_cal_distance(processes: int) -> None:
+    for i, msg in enumerate(random_messages(1, 60)):
+        similarity.id_msg[str(1000 + i)] = msg
+    similarity.cal_distance(log, output=False, number=5, processes=processes)
+    expected = full_neighbors(5)
+    assert similarity.neighbors == expected
+    assert similarity.result == {job_id: [n for n, _ in matched] for job_id, matched in expected.items()}
+
+
+@pytest.mark.parametrize("number", [3, 10])
+def test_update_neighbors(number: int) -> None:
+    msgs = random_messages(2, 120)
+    for step in (40, 41, 70, 120):
+        similarity.id_msg.clear()
+        similarity.id_msg.update((str(1000 + i), msgs[i]) for i in range(step))
+        similarity.result.clear()
+        similarity.cal_distance(log, output=False, number=number, processes=1)
+        # the incremental neighbors are the ones of a full recomputation
+        assert similarity.neighbors == full_neighbors(number)
+
+
+def test_neighbors_dropped_for_other_number() -> None:
+    for i, msg in enumerate(random_messages(3, 30)):
+        similarity.id_msg[str(i)] = msg
+    similarity.cal_distance(log, output=False, number=3, processes=1)
+    similarity.cal_distance(log, output=False, number=5, processes=1)
+    assert similarity.neighbors == full_neighbors(5)
+
+
+def test_parallel_map() -> None:
+    similarity.shared["msgs"] = ["a", "ab", "abc"]
+    similarity.shared["known"] = {}
+    res = list(similarity.parallel_map(similarity.row_worker, range(3), 2, "test", "row"))
+    assert res == [[1, 2], [1], []]
+
+
+def test_condensed_distances() -> None:
+    msgs = list(dict.fromkeys(random_messages(4, 30)))
+    # a known distance is taken as is
+    known = {(msgs[0], msgs[1]): 999}
+    distances = similarity.condensed_distances(msgs, 2, known)
+    pairs = list(itertools.combinations(msgs, 2))
+    assert distances[0] == 999
+    assert distances[1:] == [Levenshtein.distance(a, b) for a, b in pairs[1:]]
+    assert similarity.shared == {}
+
+
+def write_log(testdir: pathlib.Path, job_id: str, name: str, data: bytes) -> None:
+    (testdir / job_id).mkdir(parents=True)
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(testdir / job_id / name, "wb") as f:
+        f.write(data)
+
+
+def test_read_id_msg(tmp_path: pathlib.Path) -> None:
+    testdir = tmp_path / "testresults"
+    write_log(testdir, "1", "autoinst-log.txt", b"a\nTest died: first\nb\nTest died: last at line 1\nc\n")
+    write_log(testdir, "2", "autoinst-log.txt", b"all fine\n")
+    write_log(testdir, "3", "autoinst-log.txt.gz", b"Test died: compressed")
+    write_log(testdir, "4", "autoinst-log.txt", b"")
+    (testdir / "5").mkdir()
+    similarity.read_id_msg(log, f"{testdir}/", 2)
+    assert similarity.id_msg == {"1": "Test died: last at line 1", "3": "Test died: compressed"}
+    stored = pathlib.Path(similarity.STORE).read_text(encoding="utf-8").splitlines()
+    # clean logs are stored too, directories without a log are scanned again next time
+    assert len(stored) == 4
+
+    # a line cut short by an interrupted run is scanned again
+    with pathlib.Path(similarity.STORE).open("a", encoding="utf-8") as f:
+        f.write('{"job": "6"')
+    write_log(testdir, "6", "autoinst-log.txt", b"Test died: new\n")
+    similarity.id_msg.clear()
+    similarity.read_id_msg(log, f"{testdir}/", 1)
+    assert similarity.id_msg == {"1": "Test died: last at line 1", "3": "Test died: compressed", "6": "Test died: new"}
+    similarity.id_msg.clear()
+    similarity.read_id_msg(log, f"{testdir}/", 1)
+    assert len(similarity.id_msg) == 3
+
+
+def test_read_id_msg_converts_json(tmp_path: pathlib.Path) -> None:
+    testdir = tmp_path / "testresults"
+    testdir.mkdir()
+    pathlib.Path("id_msg.json").write_text('{"7": "Test died: old"}', encoding="utf-8")
+    similarity.read_id_msg(log, f"{testdir}/", 1)
+    assert similarity.id_msg == {"7": "Test died: old"}
+    assert pathlib.Path(similarity.STORE).exists()
+
+
+class FakeClient:
+    """OpenQA_Client recording the posted comments and failing the jobs in fail once."""
+
+    posted: ClassVar[list[str]] = []
+    fail: ClassVar[set[str]] = set()
+
+    def __init__(self, server: str) -> None:
+        self.server = server
+
+    def openqa_request(self, _method: str, path: str, _params: dict, **_kwargs: int) -> None:
+        job_id = path.split("/")[1]
+        if job_id in FakeClient.fail:
+            FakeClient.fail.discard(job_id)
+            raise similarity.OpenQAClientError(path)
+        FakeClient.posted.append(job_id)
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> type[FakeClient]:
+    monkeypatch.setattr(similarity, "OpenQA_Client", FakeClient)
+    monkeypatch.setattr(similarity, "BACKOFF", 0)
+    FakeClient.posted = []
+    FakeClient.fail = set()
+    return FakeClient
+
+
+def post(retries: int = 0) -> None:
+    similarity.post(log, "http://openqa", 1, workers=4, rate=0, retries=retries)
+
+
+def test_post_bootstrap(client: type[FakeClient]) -> None:
+    similarity.result.update({str(i): [str(i + 1)] for i in range(10)})
+    # nothing tells whether the results of earlier runs were ever posted
+    post()
+    assert sorted(client.posted, key=int) == [str(i) for i in range(10)]
+    client.posted.clear()
+    post()
+    assert client.posted == []
+
+
+def test_post_resumes(client: type[FakeClient]) -> None:
+    similarity.result.update({str(i): [str(i + 1)] for i in range(5)})
+    client.fail = {"2", "3"}
+    post()
+    assert sorted(client.posted) == ["0", "1", "4"]
+    client.posted.clear()
+    similarity.result["0"] = ["4"]
+    post()
+    # the failed comments and the changed result are posted, the others are not posted twice
+    assert sorted(client.posted) == ["0", "2", "3"]
+
+
+def test_post_retries(client: type[FakeClient]) -> None:
+    similarity.result.update({"1": ["2"]})
+    client.fail = {"1"}
+    post(retries=1)
+    assert client.posted == ["1"]
+
+
+def test_rate_limiter() -> None:
+    limiter = similarity.RateLimiter(1000)
+    start = similarity.time.monotonic()
+    for _ in range(20):
+        limiter.wait()
+    assert similarity.time.monotonic() - start >= 0.019
+
+
+def test_seed_journal(client: type[FakeClient]) -> None:
+    similarity.result.update({str(i): [str(i + 1)] for i in range(5)})
+    similarity.seed_journal(log, 1)
+    post()
+    assert client.posted == []
+    # only results changed since the journal was seeded are posted
+    similarity.result["0"] = ["4"]
+    similarity.result["5"] = ["0"]
+    post()
+    assert sorted(client.posted) == ["0", "5"]
@@ -30,6 +30,8 @@ def args_factory() -> Namespace:
     args.dry_run = False
     args.verbose = 1
     args.priority_add = 100
+    args.strategy = "each"
+    args.groups = 2
     return args
 
 
@@ -52,6 +54,8 @@ def mocked_call(cmds: list[str], dry_run: bool = False) -> list[str]:
 
 
 orig_fetch_url = openqa.fetch_url
+orig_openqa_clone = openqa.openqa_clone
+orig_openqa_comment = openqa.openqa_comment
 
 cmds = [
     "https://openqa.opensuse.org/tests/7848818",
@@ -78,7 +82,11 @@ def test_catch_CalledProcessError(caplog: pytest.LogCaptureFixture) -> None:
     exp_err = "Current job 7848818 will fail, because the repositories for the below updates are unavailable"
     error.stderr = exp_err
     comment_process = subprocess.CompletedProcess(args=[], returncode=0, stderr="", stdout=b"doo")
-    with patch("subprocess.run", side_effect=[error, comment_process]) as mocked:
+
+    def run(cmds: list[str], **kwargs: Any) -> subprocess.CompletedProcess:
+        return error if cmds[0] == "openqa-clone-job" else comment_process
+
+    with patch("subprocess.run", side_effect=run) as mocked:
         with pytest.raises(SystemExit) as e:
             openqa.main(args)
         assert re.search(
@@ -89,6 +97,62 @@ def test_catch_CalledProcessError(caplog: pytest.LogCaptureFixture) -> None:
     assert f"{exp_err}" in caplog.text
 
 
+def test_unavailable_reports_created_clones() -> None:
+    import subprocess  # noqa: S404
+
+    args = args_factory()
+    args.url = "https://openqa.opensuse.org/tests/7848818"
+    stderr = "Current job 7848818 will fail, because the repositories for the below updates are unavailable"
+
+    def clone(params: list[str], dry_run: bool) -> str:
+        if params[-4].endswith("_4"):
+            raise subprocess.CalledProcessError(1, "openqa-clone-job", stderr=stderr)
+        return json.dumps({"7848818": int(params[-4].rsplit("_", 1)[-1]) + 1000000})
+
+    with (
+        patch.object(openqa, "openqa_clone", side_effect=clone) as clone_mock,
+        patch.object(openqa, "openqa_comment", return_value="") as comment_mock,
+        patch.object(openqa, "fetch_url", side_effect=mocked_fetch_url),
+        pytest.raises(SystemExit) as e,
+    ):
+        openqa.main(args)
+    assert e.value.code == 0
+    # every clone finished before the comment and the created ones are listed in it
+    assert clone_mock.call_count == 5
+    comment_mock.assert_called_once()
+    comment = comment_mock.call_args[0][2]
+    assert comment.startswith(f"Not triggering any bisect jobs because: {stderr}")
+    assert [line.rsplit("/t", 1)[-1] for line in comment.splitlines() if line.startswith("* ")] == [
+        "1000003",
+        "1021637",
+        "1022085",
+        "1022192",
+    ]
+
+
+def test_error_reports_created_clones() -> None:
+    import subprocess  # noqa: S404
+
+    args = args_factory()
+    args.url = "https://openqa.opensuse.org/tests/7848818"
+
+    def clone(params: list[str], dry_run: bool) -> str:
+        if params[-4].endswith("_4"):
+            raise subprocess.CalledProcessError(255, "openqa-clone-job", stderr="boom")
+        return json.dumps({"7848818": 234567})
+
+    with (
+        patch.object(openqa, "openqa_clone", side_effect=clone),
+        patch.object(openqa, "openqa_comment", return_value="") as comment_mock,
+        patch.object(openqa, "fetch_url", side_effect=mocked_fetch_url),
+        pytest.raises(subprocess.CalledProcessError),
+    ):
+        openqa.main(args)
+    comment = comment_mock.call_args[0][2]
+    assert comment.startswith("Automatic bisect jobs:\n\n")
+    assert comment.count("* **") == 4
+
+
 def test_clone() -> None:
     openqa.call = MagicMock(side_effect=mocked_call)
     openqa.openqa_clone(cmds, dry_run=False)
@@ -124,32 +188,11 @@ def test_comment() -> None:
     openqa.call.assert_called_once_with(args, False)
 
 
-def test_set_job_prio() -> None:
-    openqa.call = MagicMock(side_effect=mocked_call)
-    openqa.openqa_set_job_prio(1234567, "https://openqa.opensuse.org", 42, dry_run=False)
-    args = [
-        "openqa-cli",
-        "api",
-        "--header",
-        "User-Agent: openqa-trigger-bisect-jobs (https://github.com/os-autoinst/os-autoinst-scripts)",
-        "--host",
-        "https://openqa.opensuse.org",
-        "--json",
-        "--data",
-        '{"priority": 42}',
-        "-X",
-        "PUT",
-        "jobs/1234567",
-    ]
-    openqa.call.assert_called_once_with(args, False)
-
-
 def test_triggers() -> None:
     args = args_factory()
     args.url = "https://openqa.opensuse.org/tests/7848818"
     openqa.openqa_clone = MagicMock(return_value='{"7848818": 234567}')
     openqa.openqa_comment = MagicMock(return_value="")
-    openqa.openqa_set_job_prio = MagicMock(return_value="")
     openqa.fetch_url = MagicMock(side_effect=mocked_fetch_url)
     openqa.main(args)
     calls = [
@@ -161,6 +204,7 @@ def test_triggers() -> None:
                 "TEST=foo:investigate:bisect_without_3",
                 "OPENQA_INVESTIGATE_ORIGIN=https://openqa.opensuse.org/tests/7848818",
                 "MAINT_TEST_REPO=",
+                "_PRIORITY=150",
             ],
             False,
         ),
@@ -172,6 +216,7 @@ def test_triggers() -> None:
                 "TEST=foo:investigate:bisect_without_4",
                 "OPENQA_INVESTIGATE_ORIGIN=https://openqa.opensuse.org/tests/7848818",
                 "MAINT_TEST_REPO=",
+                "_PRIORITY=150",
             ],
             False,
         ),
@@ -183,6 +228,7 @@ def test_triggers() -> None:
                 "TEST=foo:investigate:bisect_without_21637",
                 "OPENQA_INVESTIGATE_ORIGIN=https://openqa.opensuse.org/tests/7848818",
                 "MAINT_TEST_REPO=",
+                "_PRIORITY=150",
             ],
             False,
         ),
@@ -194,6 +240,7 @@ def test_triggers() -> None:
                 "TEST=foo:investigate:bisect_without_22085",
                 "OPENQA_INVESTIGATE_ORIGIN=https://openqa.opensuse.org/tests/7848818",
                 "MAINT_TEST_REPO=",
+                "_PRIORITY=150",
             ],
             False,
         ),
@@ -205,6 +252,7 @@ def test_triggers() -> None:
                 "TEST=foo:investigate:bisect_without_22192",
                 "OPENQA_INVESTIGATE_ORIGIN=https://openqa.opensuse.org/tests/7848818",
                 "MAINT_TEST_REPO=",
+                "_PRIORITY=150",
             ],
             False,
         ),
@@ -216,8 +264,35 @@ def test_triggers() -> None:
         "Automatic bisect jobs:\n\n* **foo:investigate:bisect_without_3**: https://openqa.opensuse.org/t234567\n* **foo:investigate:bisect_without_4**: https://openqa.opensuse.org/t234567\n* **foo:investigate:bisect_without_21637**: https://openqa.opensuse.org/t234567\n* **foo:investigate:bisect_without_22085**: https://openqa.opensuse.org/t234567\n* **foo:investigate:bisect_without_22192**: https://openqa.opensuse.org/t234567\n",
         False,
     )
-    prio_calls = 5 * [call(234567, "https://openqa.opensuse.org/tests/7848818", 150, False)]
-    assert prio_calls == openqa.openqa_set_job_prio.call_args_list
+
+
+def test_triggers_concurrent_order() -> None:
+    import threading
+    import time
+
+    args = args_factory()
+    args.url = "https://openqa.opensuse.org/tests/7848818"
+    started = threading.Barrier(5)
+
+    def clone(params: list[str], dry_run: bool) -> str:
+        issue = int(params[-4].rsplit("_", 1)[-1])
+        # all clones are in flight at the same time and the first ones finish last
+        started.wait(timeout=5)
+        time.sleep(0.01 if issue < 100 else 0)
+        return json.dumps({"7848818": issue + 1000000})
+
+    openqa.openqa_clone = MagicMock(side_effect=clone)
+    openqa.openqa_comment = MagicMock(return_value="")
+    openqa.fetch_url = MagicMock(side_effect=mocked_fetch_url)
+    openqa.main(args)
+    comment = openqa.openqa_comment.call_args[0][2]
+    assert [line.rsplit("/t", 1)[-1] for line in comment.splitlines()[2:]] == [
+        "1000003",
+        "1000004",
+        "1021637",
+        "1022085",
+        "1022192",
+    ]
 
 
 def test_problems() -> None:
@@ -371,4 +446,187 @@ def test_issue_types() -> None:
 
 def test_parsing_incident_id_from_repo() -> None:
     i = Incident("http://%REPO_MIRROR_HOST%/ibs/SUSE:/SLFO:/1.2:/PullRequest:/1266:/SL-Micro/…/")
-    assert i.incident_id == "1266"
+    assert i.incident_id == 1266
+    assert Incident("21637").incident_id == 21637
+    assert Incident("http://download.suse.de/ibs/SUSE:/Maintenance:/21637/SUSE_Updates/").incident_id == 21637
+    assert Incident("foo").incident_id is None
+
+
+def test_incident_interned() -> None:
+    assert Incident("1266") is Incident("1266")
+    assert Incident("2") < Incident("10")
+    assert not hasattr(Incident("1266"), "__dict__")
+
+
+def test_native_client() -> None:
+    client = MagicMock()
+    with patch.object(openqa, "NATIVE_CLIENT", True), patch.object(openqa, "api_client", return_value=client):
+        orig_openqa_clone(cmds, dry_run=False)
+        client.clone.assert_called_once_with(
+            "7848818",
+            {
+                "OS_TEST_ISSUES": "21770,21926,21954,22030,22077,22085,22192",
+                "TEST": "foo:investigate:bisect_without_21637",
+                "OPENQA_INVESTIGATE_ORIGIN": "https://openqa.opensuse.org/tests/7848818",
+                "_GROUP": "0",
+            },
+        )
+        orig_openqa_comment(1234567, "https://openqa.opensuse.org", "foo", dry_run=False)
+        client.comment.assert_called_once_with(1234567, "foo")
+
+
+def test_split_groups() -> None:
+    assert openqa.split_groups(["1", "2", "3", "4", "5"], 2) == [["1", "2"], ["3", "4", "5"]]
+    assert openqa.split_groups(["1", "2", "3", "4", "5"], 3) == [["1"], ["2", "3"], ["4", "5"]]
+    assert openqa.split_groups(["1", "2"], 4) == [["1"], ["2"]]
+
+
+@pytest.mark.parametrize("groups", ["0", "1", "-3", "two"])
+def test_groups_rejected(groups: str) -> None:
+    argv = ["openqa-trigger-bisect-jobs", "--url", "https://openqa.opensuse.org/tests/1", "--groups", groups]
+    with patch("sys.argv", argv), pytest.raises(SystemExit) as e:
+        openqa.parse_args()
+    assert e.value.code == 2
+
+
+def test_groups_accepted() -> None:
+    argv = ["openqa-trigger-bisect-jobs", "--url", "https://openqa.opensuse.org/tests/1", "--groups", "3"]
+    with patch("sys.argv", argv):
+        assert openqa.parse_args().groups == 3
+
+
+def test_triggers_split() -> None:
+    args = args_factory()
+    args.url = "https://openqa.opensuse.org/tests/7848818"
+    args.strategy = "split"
+    openqa.openqa_clone = MagicMock(return_value='{"7848818": 234567}')
+    openqa.openqa_comment = MagicMock(return_value="")
+    openqa.fetch_url = MagicMock(side_effect=mocked_fetch_url)
+    openqa.main(args)
+    assert openqa.openqa_clone.call_args_list == [
+        call(
+            [
+                "https://openqa.opensuse.org/tests/7848818",
+                "CRAZY_TEST_ISSUES=1",
+                "COMMON_TEST_ISSUES=1,21637,21770,21926,21954,22030,22077,22085,22192",
+                "TEST=foo:investigate:bisect_without_3_4",
+                "OPENQA_INVESTIGATE_ORIGIN=https://openqa.opensuse.org/tests/7848818",
+                "MAINT_TEST_REPO=",
+                "_PRIORITY=150",
+                "BISECT_WITHOUT=3,4",
+            ],
+            False,
+        ),
+        call(
+            [
+                "https://openqa.opensuse.org/tests/7848818",
+                "OS_TEST_ISSUES=21770,21926,21954,22030,22077",
+                "COMMON_TEST_ISSUES=1,3,4,21770,21926,21954,22030,22077",
+                "TEST=foo:investigate:bisect_without_21637_22085_22192",
+                "OPENQA_INVESTIGATE_ORIGIN=https://openqa.opensuse.org/tests/7848818",
+                "MAINT_TEST_REPO=",
+                "_PRIORITY=150",
+                "BISECT_WITHOUT=21637,22085,22192",
+            ],
+            False,
+        ),
+    ]
+    openqa.openqa_comment.assert_called_once_with(
+        7848818,
+        "https://openqa.opensuse.org",
+        "Automatic bisect jobs:\n\n* **foo:investigate:bisect_without_3_4**: https://openqa.opensuse.org/t234567\n* **foo:investigate:bisect_without_21637_22085_22192**: https://openqa.opensuse.org/t234567\n",
+        False,
+    )
+
+
+def test_split_recursion() -> None:
+    args = args_factory()
+    args.url = "https://openqa.opensuse.org/tests/7848820"
+    openqa.openqa_clone = MagicMock(return_value='{"7848818": 234568}')
+    openqa.openqa_comment = MagicMock(return_value="")
+    openqa.fetch_url = MagicMock(side_effect=mocked_fetch_url)
+    openqa.main(args)
+    # the passed group job recurses into its group cloning the origin job again
+    test_names = [p for c in openqa.openqa_clone.call_args_list for p in c[0][0] if p.startswith("TEST=")]
+    assert test_names == [
+        "TEST=foo:investigate:bisect_without_21637",
+        "TEST=foo:investigate:bisect_without_22085_22192",
+    ]
+    assert all(c[0][0][0] == "https://openqa.opensuse.org/tests/7848818" for c in openqa.openqa_clone.call_args_list)
+    assert openqa.openqa_clone.call_args_list[1][0][0][-1] == "BISECT_WITHOUT=22085,22192"
+    assert openqa.openqa_comment.call_args[0][0] == 7848818
+
+
+def test_batch_same_changes() -> None:
+    args = args_factory()
+    args.url = [
+        "https://openqa.opensuse.org/tests/7848819",
+        "https://openqa.opensuse.org/tests/7848818",
+        "http://openqa.opensuse.org/tests/101",
+        "http://openqa.opensuse.org/tests/123",
+    ]
+    openqa.openqa_clone = MagicMock(return_value='{"7848818": 234567}')
+    openqa.openqa_comment = MagicMock(return_value="")
+    openqa.fetch_url = MagicMock(side_effect=mocked_fetch_url)
+    # the invalid job data of 123 fails the batch only at the end
+    with pytest.raises(SystemExit) as e:
+        openqa.main_batch(args)
+    assert e.value.code == 1
+    # only the job with the lowest id is bisected
+    assert openqa.openqa_clone.call_count == 5
+    assert all(c[0][0][0] == "https://openqa.opensuse.org/tests/7848818" for c in openqa.openqa_clone.call_args_list)
+    assert [c[0][0] for c in openqa.openqa_comment.call_args_list] == [7848818, 7848819]
+    shared = openqa.openqa_comment.call_args_list[1][0][2]
+    assert shared.startswith(
+        "Automatic bisect jobs of https://openqa.opensuse.org/t7848818 with the same incident changes:\n\n"
+    )
+    assert shared.endswith(openqa.openqa_comment.call_args_list[0][0][2].removeprefix("Automatic bisect jobs:\n\n"))
+
+
+def test_batch_continues_after_errors(caplog: pytest.LogCaptureFixture) -> None:
+    args = args_factory()
+    args.url = [
+        "https://openqa.opensuse.org/tests/7848819",
+        "https://openqa.opensuse.org/tests/7848818",
+        "http://openqa.opensuse.org/tests/404",
+    ]
+
+    def fetch_url(url: str, request_type: str = "text") -> Any:
+        if "/404" in url:
+            msg = "404 Client Error"
+            raise requests.exceptions.HTTPError(msg)
+        return mocked_fetch_url(url, request_type)
+
+    with (
+        patch.object(openqa, "openqa_clone", return_value='{"7848818": 234567}') as clone_mock,
+        patch.object(openqa, "openqa_comment", return_value="") as comment_mock,
+        patch.object(openqa, "fetch_url", side_effect=fetch_url),
+        pytest.raises(SystemExit) as e,
+    ):
+        openqa.main_batch(args)
+    assert e.value.code == 1
+    # the other jobs were still bisected and commented on
+    assert clone_mock.call_count == 5
+    assert [c[0][0] for c in comment_mock.call_args_list] == [7848818, 7848819]
+    assert "Failed to fetch http://openqa.opensuse.org/tests/404" in caplog.text
+
+
+def test_batch_continues_after_trigger_errors(caplog: pytest.LogCaptureFixture) -> None:
+    args = args_factory()
+    args.url = [
+        "https://openqa.opensuse.org/tests/7848819",
+        "https://openqa.opensuse.org/tests/7848818",
+        "https://openqa.opensuse.org/tests/7848820",
+    ]
+    with (
+        patch.object(openqa, "openqa_clone", return_value='{"7848818": 234567}'),
+        patch.object(openqa, "openqa_comment", return_value=""),
+        patch.object(openqa, "fetch_url", side_effect=mocked_fetch_url),
+        patch.object(openqa, "trigger_bisect_jobs", side_effect=KeyError("priority")) as trigger_mock,
+        pytest.raises(SystemExit) as e,
+    ):
+        openqa.main_batch(args)
+    assert e.value.code == 1
+    # the group bisection of 7848820 and the shared changes of 7848818/7848819 were all attempted
+    assert trigger_mock.call_count == 2
+    assert "Failed to bisect https://openqa.opensuse.org/tests/7848818" in caplog.text